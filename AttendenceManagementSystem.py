@@ -1,29 +1,139 @@
+import time
+
+STARTED = time.perf_counter()  # Module load: the start of time-to-first-window
+
 import tkinter as tk
 
 import os
 import datetime
-import openpyxl
+import json
+import queue
+import sqlite3
+import sys
+import threading
 from tkinter import ttk, simpledialog, messagebox, filedialog
 from datetime import datetime
-from openpyxl import Workbook, load_workbook
 import os
 
+from attendance_core import (
+    MONTHS, SHEET_FILETYPES, AttendanceStore, HistoryStore, ReportCache, SQLiteBackend, format_summary_line,
+    read_attendance_file, read_roster_file, sheet_year, write_attendance_file, write_report_workbook
+)
+from attendance_analytics import compute_analytics, format_analytics
+from attendance_import import bulk_import, format_import_report
+from attendance_journal import Journal
+from attendance_merge import RULES, apply_merge, format_merge_report, plan_merge, write_conflict_report
+from attendance_perf import PERF, timed
+from attendance_undo import UndoHistory
+
+LOAD_CHUNK_ROWS = 5000  # Rows moved into the model per Tk event loop turn
+AUTOSAVE_SYNC_MS = 1000  # Longest a journalled change waits for fsync
+AUTOSAVE_COMPACT_SECONDS = 60  # Compact pending changes at least this often
+AUTOSAVE_COMPACT_BYTES = 1 << 20  # ...or as soon as the journal grows past this
+SETTINGS_PATH = os.path.expanduser("~/.attendance_settings.json")
+UNSAVED_SETTINGS = ("default_month", "smtp_password")  # Per run, or kept off disk
+
+
+class BackgroundTask:
+    """Run work(progress) on a worker thread, reporting back on the Tk thread.
+
+    The worker only puts messages on a queue; the Tk thread drains it with
+    after() and calls on_progress(done, total), on_done(result) or
+    on_error(exception), so no Tk call is ever made off the main thread.
+    """
+    POLL_MS = 50
+    
+    def __init__(self, widget, work, on_done, on_error, on_progress=None):
+        self.widget = widget
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.queue = queue.Queue()
+        
+        threading.Thread(target=self.run, args=(work,), daemon=True).start()
+        self.widget.after(self.POLL_MS, self.poll)
+    
+    def run(self, work):
+        try:
+            self.queue.put(("done", work(self.report_progress)))
+        except Exception as e:
+            self.queue.put(("error", e))
+    
+    def report_progress(self, done, total):
+        self.queue.put(("progress", (done, total)))
+    
+    def poll(self):
+        """Deliver queued messages and keep polling until the work finishes"""
+        while True:
+            try:
+                kind, payload = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                if self.on_progress:
+                    self.on_progress(*payload)
+            elif kind == "done":
+                self.on_done(payload)
+                return
+            else:
+                self.on_error(payload)
+                return
+        self.widget.after(self.POLL_MS, self.poll)
+
+
+def sheet_period(month_name, date):
+    """Return (year, month number) from a sheet's Month and Date fields"""
+    month = MONTHS.index(month_name) + 1 if month_name in MONTHS else datetime.now().month
+    try:
+        year = sheet_year(month, date)
+    except ValueError:
+        year = datetime.now().year
+    return year, month
+
+
+def format_progress(action, done, total):
+    """Format a progress message for a status label"""
+    percent = (done / total) * 100 if total else 100
+    return f"{action}... {done}/{total} rows ({percent:.0f}%)"
+
 
 class AttendanceApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, autosave=True):
         super().__init__()
         self.title("Attendance Management System")
         self.geometry("1200x800")
         self.configure(bg="#f0f0f0")
         
         # Initialize data structures
-        self.name_data = []  # Stores (name, email, sap) tuples
-        self.attendance_data = {}  # Maps names to attendance vars
+        self.store = AttendanceStore()  # Roster and attendance matrix
+        self.report_cache = ReportCache()  # Summaries and report text per (month, store version)
         self.settings = {
             "default_month": datetime.now().strftime("%B"),
             "default_save_path": os.path.expanduser("~/Documents"),
-            "theme": "light"
+            "theme": "light",
+            "database_path": "",  # Optional SQLite file; empty until first used
+            "history_path": os.path.expanduser("~/Documents/attendance_history"),
+            "low_attendance_threshold": 75.0,  # Percent; reports list everyone below it
+            "autosave_path": os.path.expanduser("~/Documents/attendance_autosave"),
+            "smtp_host": "localhost",
+            "smtp_port": 25,
+            "smtp_username": "",  # Empty: send without logging in
+            "smtp_password": "",
+            "smtp_starttls": False,
+            "smtp_sender": "",  # From address; notifications are off until it is set
+            "smtp_rate": 5.0,  # Messages per second
+            "undo_steps": 100,  # Steps Undo can go back
+            "undo_memory_mb": 64  # Rough cap on the data kept for undo
         }
+        self.load_settings()
+        self.database = None  # Opened lazily by get_database()
+        self.history = None  # Opened lazily by get_history()
+        self.sheet = {"month": self.settings["default_month"],  # Month and date until the
+                      "date": datetime.now().strftime("%Y-%m-%d")}  # attendance page is built
+        self.startup_seconds = None  # Set once the first window is up
+        self.journal = None  # Autosave journal, set up by start_autosave()
+        self.compacting = False
+        self.last_compaction = time.monotonic()
         
         # Create container frame
         self.container = tk.Frame(self)
@@ -31,12 +141,9 @@ class AttendanceApp(tk.Tk):
         self.container.grid_rowconfigure(0, weight=1)
         self.container.grid_columnconfigure(0, weight=1)
         
-        # Initialize all frames
+        # Pages are built the first time they are shown
+        self.pages = {F.__name__: F for F in (MainMenu, AttendancePage, ReportsPage, SettingsPage)}
         self.frames = {}
-        for F in (MainMenu, AttendancePage, ReportsPage, SettingsPage):
-            frame = F(parent=self.container, controller=self)
-            self.frames[F.__name__] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
         
         # Configure style
         self.configure_styles()
@@ -44,9 +151,25 @@ class AttendanceApp(tk.Tk):
         # Show the main menu first
         self.show_frame("MainMenu")
         
+        if autosave:
+            self.start_autosave()
+        # Attached after any autosave recovery, which is not undoable
+        self.undo_history = UndoHistory(self.store)
+        self.configure_undo()
+        self.after_idle(self.first_window_shown)
+        
+    def get_frame(self, page_name):
+        """Return a page, constructing it the first time it is needed"""
+        frame = self.frames.get(page_name)
+        if frame is None:
+            frame = self.pages[page_name](parent=self.container, controller=self)
+            frame.grid(row=0, column=0, sticky="nsew")
+            self.frames[page_name] = frame
+        return frame
+    
     def show_frame(self, page_name):
         """Show a frame for the given page name"""
-        frame = self.frames[page_name]
+        frame = self.get_frame(page_name)
         frame.tkraise()
         if hasattr(frame, "on_show"):
             frame.on_show()
@@ -62,25 +185,149 @@ class AttendanceApp(tk.Tk):
         self.style.configure('Menu.TButton', font=('Arial', 12), padding=10)
         self.style.configure('Summary.TLabel', font=('Arial', 10, 'bold'), foreground='blue')
         
+    def first_window_shown(self):
+        """Record time-to-first-window in the performance recorder"""
+        self.startup_seconds = time.perf_counter() - STARTED
+        PERF.record("startup (first window)", self.startup_seconds)
+    
+    def load_settings(self):
+        """Overlay the saved settings file on the defaults"""
+        try:
+            with open(SETTINGS_PATH, encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            messagebox.showwarning("Settings", f"Could not read {SETTINGS_PATH}; using defaults.\n{str(e)}")
+            return
+        self.settings.update((key, value) for key, value in saved.items()
+                             if key in self.settings and key not in UNSAVED_SETTINGS)
+    
+    def save_settings(self):
+        """Write the settings file, replacing it atomically"""
+        saved = {key: value for key, value in self.settings.items() if key not in UNSAVED_SETTINGS}
+        with open(SETTINGS_PATH + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(saved, f, indent=2)
+        os.replace(SETTINGS_PATH + ".tmp", SETTINGS_PATH)
+    
+    def configure_undo(self):
+        """Apply the undo history size settings"""
+        self.undo_history.max_steps = max(1, int(self.settings["undo_steps"]))
+        self.undo_history.max_bytes = int(float(self.settings["undo_memory_mb"]) * (1 << 20))
+        self.undo_history.trim()
+    
+    def sheet_meta(self):
+        """Return the sheet's month and date, without building the attendance page"""
+        page = self.frames.get("AttendancePage")
+        if page is None:
+            return dict(self.sheet)
+        return {"month": page.month_var.get(), "date": page.date_var.get()}
+    
+    def selected_period(self):
+        """Return (year, month number) of the sheet"""
+        meta = self.sheet_meta()
+        return sheet_period(meta["month"], meta["date"])
+    
+    def cached(self, name, compute):
+        """Return compute() for the selected month, recomputed only after the data changes"""
+        period = self.selected_period()
+        return self.report_cache.get(period, self.store.version, name, compute)
+    
     def get_attendance_summary(self):
         """Generate attendance summary data"""
-        if not self.name_data:
-            return []
-            
-        total_days = len(self.attendance_data[self.name_data[0][0]]) if self.name_data else 0
-        summary = []
-        
-        for name, _, _ in self.name_data:
-            present_days = sum(var.get() for var in self.attendance_data[name])
-            percentage = (present_days / total_days) * 100 if total_days > 0 else 0
-            summary.append({
-                "name": name,
-                "present": present_days,
-                "total": total_days,
-                "percentage": percentage
-            })
-        
-        return summary
+        return self.cached("summary", self.store.summary)
+    
+    def get_overall_statistics(self):
+        """Roster-wide attendee, day and present totals"""
+        return self.cached("overall", self.store.overall_statistics)
+    
+    def get_analytics(self):
+        """Compute report statistics for the month selected on the attendance page"""
+        year, month = self.selected_period()
+        threshold = self.settings["low_attendance_threshold"]
+        return self.cached(("analytics", threshold),
+                           lambda: compute_analytics(self.store, year, month, threshold))
+    
+    def get_database(self):
+        """Return the SQLite backend, asking for a file the first time"""
+        path = self.settings["database_path"]
+        if not path:
+            path = filedialog.asksaveasfilename(
+                initialdir=self.settings["default_save_path"],
+                defaultextension=".db",
+                filetypes=[("SQLite database", "*.db"), ("All files", "*.*")],
+                title="Choose Attendance Database",
+                confirmoverwrite=False
+            )
+            if not path:
+                return None
+            self.settings["database_path"] = path
+        
+        if self.database is None or self.database.path != path:
+            if self.database is not None:
+                self.database.close()
+            self.database = SQLiteBackend(path)
+        return self.database
+    
+    def get_history(self):
+        """Return the month-partitioned history store"""
+        path = self.settings["history_path"]
+        if self.history is None or self.history.directory != path:
+            self.history = HistoryStore(path)
+        return self.history
+    
+    def start_autosave(self):
+        """Replay any autosaved changes left by a crash, then journal every change"""
+        path = self.settings["autosave_path"]
+        try:
+            journal = Journal(path)
+            store, meta, replayed = journal.recover(self.store.days)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showwarning("Autosave", f"Could not recover the autosave in {path}; "
+                                               f"autosave is off for this session.\n{str(e)}")
+            return
+        
+        if len(store):
+            self.store.extend(store.people, store.cells)
+            self.sheet.update(meta)
+        journal.changes = replayed  # Fold replayed changes into the next snapshot
+        self.journal = journal
+        self.store.listeners.append(journal.record)
+        self.after(AUTOSAVE_SYNC_MS, self.autosave_tick)
+    
+    def autosave_tick(self):
+        """fsync the journal, and compact it when it is old or large enough"""
+        journal = self.journal
+        journal.sync()
+        due = time.monotonic() - self.last_compaction >= AUTOSAVE_COMPACT_SECONDS
+        if journal.changes and not self.compacting and (due or journal.size >= AUTOSAVE_COMPACT_BYTES):
+            self.compact_journal()
+        self.after(AUTOSAVE_SYNC_MS, self.autosave_tick)
+    
+    def compact_journal(self):
+        """Write a snapshot of the store on a worker thread and drop the journal it covers"""
+        meta = self.sheet_meta()
+        snapshot = self.store.copy()
+        journal = self.journal
+        covered = journal.rotate()
+        self.compacting = True
+        
+        def finished(_):
+            self.compacting = False
+            self.last_compaction = time.monotonic()
+        
+        def failed(e):
+            # The covered segments are kept, so the next compaction retries them
+            finished(None)
+            messagebox.showwarning("Autosave", f"Failed to compact the autosave journal:\n{str(e)}")
+        
+        BackgroundTask(self, lambda progress: journal.write_snapshot(snapshot, covered, meta), finished, failed)
+    
+    def destroy(self):
+        """Flush the autosave journal before closing"""
+        if self.journal is not None:
+            self.journal.close()
+        super().destroy()
 
 class MainMenu(tk.Frame):
     def __init__(self, parent, controller):
@@ -130,40 +377,100 @@ class AttendancePage(tk.Frame):
         
         # Date and Month
         ttk.Label(control_frame, text="Date:").grid(row=0, column=0, sticky="e", padx=5)
-        self.date_var = tk.StringVar(value=datetime.now().strftime("%Y-%m-%d"))
+        self.date_var = tk.StringVar(value=controller.sheet["date"])
         ttk.Entry(control_frame, textvariable=self.date_var, width=12).grid(row=0, column=1, sticky="w", padx=5)
         
         ttk.Label(control_frame, text="Month:").grid(row=0, column=2, sticky="e", padx=5)
-        self.month_var = tk.StringVar(value=controller.settings["default_month"])
-        months = ["January", "February", "March", "April", "May", "June",
-                 "July", "August", "September", "October", "November", "December"]
+        self.month_var = tk.StringVar(value=controller.sheet["month"])
         ttk.Combobox(control_frame, textvariable=self.month_var, 
-                    values=months, state="readonly", width=10).grid(row=0, column=3, sticky="w", padx=5)
+                    values=MONTHS, state="readonly", width=10).grid(row=0, column=3, sticky="w", padx=5)
         
         # Buttons
         button_frame = ttk.Frame(control_frame)
         button_frame.grid(row=0, column=4, columnspan=4, sticky="e", padx=10)
         
+        ttk.Button(button_frame, text="Undo", command=self.undo).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Redo", command=self.redo).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Add Attendee", command=self.add_attendee).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Import Roster", command=self.import_roster).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Remove Last", command=self.remove_attendee).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Remove Selected", command=self.remove_selected).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Clear All", command=self.clear_attendees).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Save", command=self.save_attendance).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Load", command=self.load_attendance).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Save DB", command=self.save_to_database).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Load DB", command=self.load_from_database).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Archive Month", command=self.archive_month).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Import Folder", command=self.import_folder).pack(side="left", padx=5)
+        
+        # Live search over name, email and SAP ID
+        ttk.Label(control_frame, text="Search:").grid(row=1, column=0, sticky="e", padx=5)
+        self.search_var = tk.StringVar()
+        ttk.Entry(control_frame, textvariable=self.search_var, width=30).grid(row=1, column=1, columnspan=3,
+                                                                            sticky="w", padx=5)
+        self.search_var.trace_add("write", self.on_search)
+        
+        # Bulk marking of a day range for the selected, filtered or all rows
+        mark_frame = ttk.Frame(control_frame)
+        mark_frame.grid(row=2, column=0, columnspan=8, sticky="w", pady=5)
+        ttk.Label(mark_frame, text="Days:").pack(side="left", padx=5)
+        self.mark_from_var = tk.IntVar(value=datetime.now().day)
+        ttk.Spinbox(mark_frame, from_=1, to=self.NUM_DAYS, textvariable=self.mark_from_var,
+                    width=4).pack(side="left")
+        ttk.Label(mark_frame, text="to").pack(side="left", padx=5)
+        self.mark_to_var = tk.IntVar(value=datetime.now().day)
+        ttk.Spinbox(mark_frame, from_=1, to=self.NUM_DAYS, textvariable=self.mark_to_var,
+                    width=4).pack(side="left")
+        ttk.Button(mark_frame, text="Mark Present", command=lambda: self.mark_days(1)).pack(side="left", padx=5)
+        ttk.Button(mark_frame, text="Mark Absent", command=lambda: self.mark_days(0)).pack(side="left", padx=5)
+        ttk.Button(mark_frame, text="Copy Previous Day", command=self.copy_previous_day).pack(side="left", padx=5)
+        
+        # Merging separately edited copies of the sheet
+        ttk.Label(mark_frame, text="Merge rule:").pack(side="left", padx=(20, 5))
+        self.merge_rule_var = tk.StringVar(value=RULES["present"])
+        ttk.Combobox(mark_frame, textvariable=self.merge_rule_var, values=list(RULES.values()),
+                     state="readonly", width=16).pack(side="left", padx=5)
+        ttk.Button(mark_frame, text="Merge Sheets", command=self.merge_sheets).pack(side="left", padx=5)
+        
+        # Background I/O status
+        self.status_var = tk.StringVar()
+        ttk.Label(control_frame, textvariable=self.status_var).grid(row=1, column=4, columnspan=4,
+                                                                    sticky="w", padx=5)
         
         # Attendees display
         self.create_attendees_display()
         
         # Summary display
         self.create_summary_display()
+        
+        # Undo/redo shortcuts, handled while this page is showing
+        for sequence, action in (("<Control-z>", self.undo), ("<Control-y>", self.redo),
+                                 ("<Control-Z>", self.redo)):
+            controller.bind(sequence, lambda e, action=action: action() if self.winfo_ismapped() else None)
     
+    # Virtual grid geometry (canvas pixels)
+    ROW_HEIGHT = 24
+    HEADER_HEIGHT = 26
+    NAME_WIDTH = 160
+    EMAIL_WIDTH = 200
+    SAP_WIDTH = 100
+    DAY_WIDTH = 24
+    BOX_SIZE = 14
+    NUM_DAYS = 31
+
     def create_attendees_display(self):
-        """Create the scrollable attendees display"""
+        """Create the scrollable attendees display.
+
+        Rows are drawn directly on the canvas and only the ones in view are
+        materialized; a small pool of row slots is re-used while scrolling.
+        """
         container = ttk.Frame(self)
         container.pack(fill="both", expand=True, padx=10, pady=10)
         
         # Canvas and scrollbars
-        self.canvas = tk.Canvas(container, borderwidth=0, background="#ffffff")
-        vsb = ttk.Scrollbar(container, orient="vertical", command=self.canvas.yview)
+        self.canvas = tk.Canvas(container, borderwidth=0, background="#ffffff",
+                                highlightthickness=0)
+        vsb = ttk.Scrollbar(container, orient="vertical", command=self.on_grid_yview)
         hsb = ttk.Scrollbar(container, orient="horizontal", command=self.canvas.xview)
         self.canvas.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
         
@@ -171,12 +478,234 @@ class AttendancePage(tk.Frame):
         hsb.pack(side="bottom", fill="x")
         self.canvas.pack(side="left", fill="both", expand=True)
         
-        # Frame inside canvas
-        self.attendees_frame = ttk.Frame(self.canvas)
-        self.canvas.create_window((0, 0), window=self.attendees_frame, anchor="nw")
+        # Column x offsets
+        self.day_x0 = self.NAME_WIDTH + self.EMAIL_WIDTH + self.SAP_WIDTH
+        self.grid_width = self.day_x0 + self.NUM_DAYS * self.DAY_WIDTH
+        
+        self.row_slots = []  # Pooled canvas items, one entry per visible row
+        self.grid_rows = None  # Store rows matching the search, or None for all
+        self.selected = set()  # Store rows selected by clicking their name
+        self.anchor_position = None  # Grid position of the last plain selection click
+        self.loading = False  # Ignore grid clicks while a load fills the model
+        self.create_grid_header()
+        
+        # Redraw on resize, hit-test clicks, scroll with the mouse wheel
+        self.canvas.bind("<Configure>", lambda e: self.render_grid())
+        self.canvas.bind("<Button-1>", self.on_grid_click)
+        self.canvas.bind("<MouseWheel>", self.on_grid_wheel)
+        self.canvas.bind("<Button-4>", lambda e: self.on_grid_yview("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.on_grid_yview("scroll", 1, "units"))
+    
+    def create_grid_header(self):
+        """Create the header row items (kept pinned to the top of the view)"""
+        c = self.canvas
+        c.create_rectangle(0, 0, self.grid_width, self.HEADER_HEIGHT,
+                           fill="#f0f0f0", outline="", tags=("header",))
+        font = ('Arial', 10, 'bold')
+        for text, x in (("Name", 5), ("Email", self.NAME_WIDTH + 5),
+                        ("SAP ID", self.NAME_WIDTH + self.EMAIL_WIDTH + 5)):
+            c.create_text(x, self.HEADER_HEIGHT // 2, text=text, anchor="w",
+                          font=font, tags=("header",))
+        for day in range(self.NUM_DAYS):
+            x = self.day_x0 + day * self.DAY_WIDTH + self.DAY_WIDTH // 2
+            c.create_text(x, self.HEADER_HEIGHT // 2, text=str(day + 1),
+                          font=font, tags=("header",))
+        c.itemconfigure("header", state="hidden")
+    
+    def create_row_slot(self):
+        """Create the canvas items for one pooled row, initially hidden"""
+        c = self.canvas
+        tag = f"slot{len(self.row_slots)}"
+        y = self.ROW_HEIGHT // 2
+        slot = {"tag": tag, "row": None, "y": 0, "values": [None] * self.NUM_DAYS, "selected": False}
+        font = ('Arial', 10)
+        slot["highlight"] = c.create_rectangle(0, 0, self.day_x0, self.ROW_HEIGHT,
+                                               fill="", outline="", tags=(tag,))
+        slot["name"] = c.create_text(5, y, anchor="w", font=font, tags=(tag,))
+        slot["email"] = c.create_text(self.NAME_WIDTH + 5, y, anchor="w", font=font, tags=(tag,))
+        slot["sap"] = c.create_text(self.NAME_WIDTH + self.EMAIL_WIDTH + 5, y,
+                                    anchor="w", font=font, tags=(tag,))
+        half = self.BOX_SIZE // 2
+        slot["boxes"] = []
+        for day in range(self.NUM_DAYS):
+            x = self.day_x0 + day * self.DAY_WIDTH + self.DAY_WIDTH // 2
+            slot["boxes"].append(c.create_rectangle(x - half, y - half, x + half, y + half,
+                                                    fill="#ffffff", outline="#808080",
+                                                    tags=(tag,)))
+        c.itemconfigure(tag, state="hidden")
+        self.row_slots.append(slot)
+        return slot
+    
+    @timed("render_grid")
+    def render_grid(self, force=False):
+        """Draw the rows currently in view, re-using pooled row items.
+
+        Cost is proportional to the number of visible rows; slots already
+        showing the right row only have changed checkbox fills updated.
+        """
+        c = self.canvas
+        people = self.controller.store.people
+        count = len(self.grid_rows) if self.grid_rows is not None else len(people)
+        if not count:
+            c.itemconfigure("header", state="hidden")
+            for slot in self.row_slots:
+                c.itemconfigure(slot["tag"], state="hidden")
+                slot["row"] = None
+            return
+        
+        top = int(c.canvasy(0))
+        height = max(c.winfo_height(), self.ROW_HEIGHT)
+        first = max(0, top // self.ROW_HEIGHT)
+        visible = height // self.ROW_HEIGHT + 2
+        while len(self.row_slots) < visible:
+            self.create_row_slot()
+        
+        for k, slot in enumerate(self.row_slots):
+            position = first + k
+            if k >= visible or position >= count:
+                if slot["row"] is not None:
+                    c.itemconfigure(slot["tag"], state="hidden")
+                    slot["row"] = None
+                continue
+            
+            row = self.grid_rows[position] if self.grid_rows is not None else position
+            y = self.HEADER_HEIGHT + position * self.ROW_HEIGHT
+            if slot["y"] != y:
+                c.move(slot["tag"], 0, y - slot["y"])
+                slot["y"] = y
+            if slot["row"] != row or force:
+                name, email, sap = people[row]
+                c.itemconfigure(slot["name"], text=name)
+                c.itemconfigure(slot["email"], text=email or "")
+                c.itemconfigure(slot["sap"], text=sap or "")
+                if slot["row"] is None:
+                    c.itemconfigure(slot["tag"], state="normal")
+                slot["row"] = row
+            if slot["selected"] != (row in self.selected):
+                slot["selected"] = row in self.selected
+                c.itemconfigure(slot["highlight"], fill="#cce0ff" if slot["selected"] else "")
+            self.render_row_boxes(slot)
+        
+        # Pin the header to the top of the visible area
+        c.itemconfigure("header", state="normal")
+        c.move("header", 0, top - c.coords("header")[1])
+        c.tag_raise("header")
+    
+    def render_row_boxes(self, slot):
+        """Refresh the checkbox fills of a pooled row from the model"""
+        values = slot["values"]
+        for day in range(self.NUM_DAYS):
+            value = self.get_cell(slot["row"], day)
+            if values[day] != value:
+                values[day] = value
+                self.canvas.itemconfigure(slot["boxes"][day],
+                                          fill="#4a90d9" if value else "#ffffff")
+    
+    def get_cell(self, row, day):
+        """Return the attendance value (0/1) of a grid cell"""
+        return self.controller.store.get(row, day)
+    
+    def toggle_cell(self, row, day):
+        """Flip the attendance value of a grid cell"""
+        self.controller.store.toggle(row, day)
+    
+    def on_grid_yview(self, *args):
+        """Scroll the grid vertically and redraw the visible rows"""
+        self.canvas.yview(*args)
+        self.render_grid()
+    
+    def on_grid_wheel(self, event):
+        """Scroll the grid with the mouse wheel"""
+        self.on_grid_yview("scroll", -1 if event.delta > 0 else 1, "units")
+    
+    def on_grid_click(self, event):
+        """Toggle the checkbox under the mouse pointer, or select its row.
+
+        Clicking a name selects that row; Ctrl adds or removes it from the
+        selection and Shift selects the range from the last click.
+        """
+        if self.loading:
+            return
+        x = self.canvas.canvasx(event.x)
+        y = self.canvas.canvasy(event.y)
+        if event.y < self.HEADER_HEIGHT:
+            return
+        
+        position = int(y - self.HEADER_HEIGHT) // self.ROW_HEIGHT
+        day = int(x - self.day_x0) // self.DAY_WIDTH if x >= self.day_x0 else None
+        count = len(self.grid_rows) if self.grid_rows is not None else len(self.controller.store)
+        if not 0 <= position < count or (day is not None and day >= self.NUM_DAYS):
+            return
+        row = self.grid_rows[position] if self.grid_rows is not None else position
+        
+        if day is None:
+            self.select_rows(position, row, shift=event.state & 0x1, ctrl=event.state & 0x4)
+            return
         
-        # Configure resizing
-        self.attendees_frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+        self.toggle_cell(row, day)
+        for slot in self.row_slots:
+            if slot["row"] == row:
+                self.render_row_boxes(slot)
+                break
+        self.update_summary_line(row)
+    
+    def select_rows(self, position, row, shift=False, ctrl=False):
+        """Update the row selection for a click at a grid position"""
+        if shift and self.anchor_position is not None:
+            low, high = sorted((self.anchor_position, position))
+            rows = self.grid_rows[low:high + 1] if self.grid_rows is not None else range(low, high + 1)
+            self.selected.update(rows)
+        elif ctrl:
+            self.selected.symmetric_difference_update({row})
+            self.anchor_position = position
+        else:
+            self.selected = {row}
+            self.anchor_position = position
+        self.render_grid()
+    
+    def marking_rows(self):
+        """Rows bulk marks apply to: the selection, else the search matches, else None for all"""
+        if self.selected:
+            return sorted(self.selected)
+        return self.grid_rows
+    
+    def marking_days(self):
+        """Return the 0-based (first, last) day of the Days fields, or None if invalid"""
+        try:
+            first, last = sorted((int(self.mark_from_var.get()), int(self.mark_to_var.get())))
+        except (tk.TclError, ValueError):
+            first = last = 0
+        if not 1 <= first <= last <= self.NUM_DAYS:
+            messagebox.showwarning("Warning", f"Days must be between 1 and {self.NUM_DAYS}")
+            return None
+        return first - 1, last - 1
+    
+    def mark_days(self, value):
+        """Mark the chosen day range present or absent in one batch"""
+        if self.busy():
+            return
+        days = self.marking_days()
+        if days is None or not self.controller.store:
+            return
+        cells = self.controller.store.mark_block(days[0], days[1], value, self.marking_rows())
+        self.render_grid()
+        self.update_summary()
+        self.status_var.set(f"Marked {cells} cells {'present' if value else 'absent'}")
+    
+    def copy_previous_day(self):
+        """Copy the day before the first chosen day onto it in one batch"""
+        if self.busy():
+            return
+        days = self.marking_days()
+        if days is None or not self.controller.store:
+            return
+        if days[0] == 0:
+            messagebox.showwarning("Warning", "Day 1 has no previous day to copy")
+            return
+        rows = self.controller.store.copy_day(days[0] - 1, days[0], self.marking_rows())
+        self.render_grid()
+        self.update_summary()
+        self.status_var.set(f"Copied day {days[0]} onto day {days[0] + 1} for {rows} attendees")
     
     def create_summary_display(self):
         """Create the summary display at the bottom"""
@@ -191,9 +720,38 @@ class AttendancePage(tk.Frame):
         scrollbar.pack(side="right", fill="y")
         self.summary_text.config(yscrollcommand=scrollbar.set)
         self.summary_text.pack(fill="x")
+        self.shown_summary = None  # (store version, period) the summary text shows
+    
+    def busy(self):
+        """True while a load is filling the model, which edits must not interleave with"""
+        if self.loading:
+            self.status_var.set("Please wait until loading has finished")
+        return self.loading
+    
+    def undo(self):
+        """Revert the latest change to the roster or marks"""
+        if self.busy():
+            return
+        if self.controller.undo_history.undo():
+            self.update_display()
+            self.status_var.set("Undone")
+        else:
+            self.status_var.set("Nothing to undo")
+    
+    def redo(self):
+        """Re-apply the latest undone change"""
+        if self.busy():
+            return
+        if self.controller.undo_history.redo():
+            self.update_display()
+            self.status_var.set("Redone")
+        else:
+            self.status_var.set("Nothing to redo")
     
     def add_attendee(self):
         """Add a new attendee"""
+        if self.busy():
+            return
         name = simpledialog.askstring("Add Attendee", "Enter the name:")
         if not name:
             return
@@ -201,178 +759,402 @@ class AttendancePage(tk.Frame):
         email = simpledialog.askstring("Add Attendee", f"Enter email for {name}:")
         sap = simpledialog.askstring("Add Attendee", f"Enter SAP ID for {name}:")
         
-        self.controller.name_data.append((name, email, sap))
-        attendance_vars = [tk.IntVar(value=0) for _ in range(31)]
-        self.controller.attendance_data[name] = attendance_vars
+        try:
+            self.controller.store.add_person(name, email, sap)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        self.update_display()
+    
+    def import_roster(self):
+        """Add or update many attendees from a .csv or .xlsx roster in one batch"""
+        file_path = filedialog.askopenfilename(
+            initialdir=self.controller.settings["default_save_path"],
+            filetypes=[("Roster files", "*.csv *.xlsx"), ("All files", "*.*")],
+            title="Import Roster"
+        )
+        if not file_path:
+            return
+        
+        def done(result):
+            people, errors = result
+            self.status_var.set("")
+            if self.busy():
+                return
+            try:
+                added, updated = self.controller.store.upsert_people(people)
+            except ValueError as e:
+                messagebox.showerror("Error", f"Failed to import roster:\n{str(e)}")
+                return
+            self.update_display()
+            message = f"Added {added} and updated {updated} attendees."
+            if errors:
+                message += f"\n\nSkipped {len(errors)} rows:\n" + "\n".join(
+                    f"Row {row}: {reason}" for row, reason in errors[:20])
+            messagebox.showinfo("Import Roster", message)
+        
+        def failed(e):
+            self.status_var.set("")
+            messagebox.showerror("Error", f"Failed to import roster:\n{str(e)}")
+        
+        self.status_var.set("Reading roster...")
+        BackgroundTask(self, lambda progress: read_roster_file(file_path), done, failed)
+    
+    def remove_selected(self):
+        """Remove every selected attendee in one batch"""
+        if self.busy():
+            return
+        if not self.selected:
+            messagebox.showwarning("Warning", "Select attendees by clicking their names first")
+            return
+        if not messagebox.askyesno("Confirm", f"Remove {len(self.selected)} selected attendees?"):
+            return
         
+        self.controller.store.remove_people(self.selected)
         self.update_display()
     
     def remove_attendee(self):
         """Remove the last attendee"""
-        if not self.controller.name_data:
+        if self.busy():
+            return
+        if not self.controller.store:
             messagebox.showwarning("Warning", "No attendees to remove")
             return
             
-        self.controller.name_data.pop()
-        self.controller.attendance_data.popitem()
+        self.controller.store.remove_person(-1)
         self.update_display()
     
     def clear_attendees(self):
         """Clear all attendees"""
-        if not self.controller.name_data:
+        if self.busy() or not self.controller.store:
             return
             
         if messagebox.askyesno("Confirm", "Clear all attendees?"):
-            self.controller.name_data.clear()
-            self.controller.attendance_data.clear()
+            self.controller.store.clear()
             self.update_display()
     
+    @timed("update_display")
     def update_display(self):
-        """Update the attendees and summary displays"""
-        # Clear existing widgets
-        for widget in self.attendees_frame.winfo_children():
-            widget.destroy()
-            
-        if not self.controller.name_data:
-            return
-            
-        # Create header row
-        ttk.Label(self.attendees_frame, text="Name", style="Header.TLabel"
-                 ).grid(row=0, column=0, padx=5, pady=2, sticky="w")
-        ttk.Label(self.attendees_frame, text="Email", style="Header.TLabel"
-                 ).grid(row=0, column=1, padx=5, pady=2, sticky="w")
-        ttk.Label(self.attendees_frame, text="SAP ID", style="Header.TLabel"
-                 ).grid(row=0, column=2, padx=5, pady=2, sticky="w")
-        
-        # Day headers (1-31)
-        for day in range(1, 32):
-            ttk.Label(self.attendees_frame, text=str(day), style="Header.TLabel"
-                     ).grid(row=0, column=2+day, padx=2, pady=2)
-        
-        # Add attendee rows
-        for row, (name, email, sap) in enumerate(self.controller.name_data, start=1):
-            ttk.Label(self.attendees_frame, text=name
-                     ).grid(row=row, column=0, padx=5, pady=2, sticky="w")
-            ttk.Label(self.attendees_frame, text=email
-                     ).grid(row=row, column=1, padx=5, pady=2, sticky="w")
-            ttk.Label(self.attendees_frame, text=sap
-                     ).grid(row=row, column=2, padx=5, pady=2, sticky="w")
-            
-            for day, var in enumerate(self.controller.attendance_data[name], start=1):
-                cb = tk.Checkbutton(self.attendees_frame, variable=var, 
-                                   command=self.update_summary)
-                cb.grid(row=row, column=2+day, padx=2, pady=2)
-        
+        """Update the attendees and summary displays after a roster change"""
+        # Row indices may have shifted, so any selection is stale
+        self.selected = set()
+        self.anchor_position = None
+        self.refresh_grid()
         self.update_summary()
     
+    def refresh_grid(self):
+        """Re-apply the search filter and redraw the visible rows"""
+        query = self.search_var.get().strip()
+        self.grid_rows = self.controller.store.search(query) if query else None
+        rows = len(self.grid_rows) if self.grid_rows is not None else len(self.controller.store)
+        self.canvas.configure(scrollregion=(0, 0, self.grid_width,
+                                            self.HEADER_HEIGHT + rows * self.ROW_HEIGHT))
+        self.render_grid(force=True)
+    
+    def on_search(self, *args):
+        """Filter the grid as the search text changes"""
+        self.canvas.yview_moveto(0)
+        self.refresh_grid()
+    
+    @timed("update_summary")
     def update_summary(self):
-        """Update the summary display"""
+        """Update the summary display, unless it already shows the current data"""
+        shown = (self.controller.store.version, self.selected_period())
+        if shown == self.shown_summary:
+            return
+        self.shown_summary = shown
         self.summary_text.config(state="normal")
         self.summary_text.delete(1.0, tk.END)
         
-        if not self.controller.name_data:
+        if not self.controller.store:
             self.summary_text.insert(tk.END, "No attendees added yet.")
             self.summary_text.config(state="disabled")
             return
             
         summary = self.controller.get_attendance_summary()
-        for item in summary:
-            self.summary_text.insert(tk.END, 
-                                   f"{item['name']}: {item['present']}/{item['total']} days ({item['percentage']:.1f}%)\n")
+        self.summary_text.insert(tk.END, "".join(format_summary_line(item) + "\n"
+                                                 for item in summary))
             
         self.summary_text.config(state="disabled")
     
+    @timed("update_summary_line")
+    def update_summary_line(self, row):
+        """Rewrite only the summary line of one attendee after a toggle"""
+        # The toggle was one change, so a summary current before it is current again after
+        store = self.controller.store
+        if self.shown_summary is not None and self.shown_summary[0] == store.version - 1:
+            self.shown_summary = (store.version, self.shown_summary[1])
+        else:
+            self.shown_summary = None
+        item = self.controller.store.summary_item(row)
+        line = row + 1
+        self.summary_text.config(state="normal")
+        self.summary_text.delete(f"{line}.0", f"{line}.end")
+        self.summary_text.insert(f"{line}.0", format_summary_line(item))
+        self.summary_text.config(state="disabled")
+    
     def save_attendance(self):
-        """Save attendance to Excel file"""
-        if not self.controller.name_data:
+        """Save attendance as .xlsx, .csv or .attc on a background thread"""
+        if not self.controller.store:
             messagebox.showwarning("Warning", "No attendance data to save")
             return
-            
-        wb = Workbook()
-        ws = wb.active
-        
-        # Add headers
-        ws['A1'] = "Month"
-        ws['B1'] = self.month_var.get()
-        ws['A2'] = "Date of update"
-        ws['B2'] = self.date_var.get()
-        ws['A3'] = "Name"
-        ws['B3'] = "Email"
-        ws['C3'] = "SAP ID"
-        
-        # Day headers
-        for day in range(1, 32):
-            ws.cell(row=3, column=3+day, value=day)
-        
-        # Add attendee data
-        for row, (name, email, sap) in enumerate(self.controller.name_data, start=4):
-            ws.cell(row=row, column=1, value=name)
-            ws.cell(row=row, column=2, value=email)
-            ws.cell(row=row, column=3, value=sap)
-            
-            for day, var in enumerate(self.controller.attendance_data[name], start=1):
-                status = "Present" if var.get() else "Absent"
-                ws.cell(row=row, column=3+day, value=status)
         
-        # Save file
         default_path = self.controller.settings["default_save_path"]
         file_path = filedialog.asksaveasfilename(
             initialdir=default_path,
             defaultextension=".xlsx",
-            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
+            filetypes=SHEET_FILETYPES,
             title="Save Attendance Sheet"
         )
         
-        if file_path:
-            try:
-                wb.save(file_path)
-                messagebox.showinfo("Success", f"Attendance saved to:\n{file_path}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save file:\n{str(e)}")
+        if not file_path:
+            return
+        
+        # Snapshot so toggles during the save cannot race the writer
+        store = self.controller.store.copy()
+        month, date = self.month_var.get(), self.date_var.get()
+        
+        def done(_):
+            self.status_var.set("")
+            messagebox.showinfo("Success", f"Attendance saved to:\n{file_path}")
+        
+        def failed(e):
+            self.status_var.set("")
+            messagebox.showerror("Error", f"Failed to save file:\n{str(e)}")
+        
+        BackgroundTask(self, lambda progress: write_attendance_file(file_path, store, month, date, progress),
+                       done, failed,
+                       lambda n, total: self.status_var.set(format_progress("Saving", n, total)))
     
     def load_attendance(self):
-        """Load attendance from Excel file"""
+        """Load an .xlsx, .csv or .attc sheet, parsing it on a background thread"""
+        if self.busy():
+            return
         default_path = self.controller.settings["default_save_path"]
         file_path = filedialog.askopenfilename(
             initialdir=default_path,
-            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
+            filetypes=SHEET_FILETYPES,
             title="Load Attendance Sheet"
         )
         
         if not file_path:
             return
             
-        try:
-            wb = load_workbook(file_path)
-            ws = wb.active
-            
-            # Clear current data
-            self.controller.name_data.clear()
-            self.controller.attendance_data.clear()
-            
-            # Load metadata
-            self.month_var.set(ws['B1'].value)
-            self.date_var.set(ws['B2'].value)
+        def failed(e):
+            self.status_var.set("")
+            messagebox.showerror("Error", f"Failed to load file:\n{str(e)}")
+        
+        store = self.controller.store
+        BackgroundTask(self, lambda progress: read_attendance_file(file_path, store.days, progress),
+                       lambda parsed: None if self.busy() else self.fill_loaded_attendance(file_path, parsed),
+                       failed,
+                       lambda n, total: self.status_var.set(format_progress("Reading", n, total)))
+    
+    def fill_loaded_attendance(self, file_path, parsed):
+        """Replace the model with a parsed sheet, a chunk per event loop turn"""
+        store = self.controller.store
+        people, cells = parsed["people"], parsed["cells"]
+        
+        # Clear current data; the clear and every chunk are undone as one step
+        self.controller.undo_history.begin()
+        store.clear()
+        self.loading = True
+        
+        # Load metadata
+        if parsed["month"] is not None:
+            self.month_var.set(parsed["month"])
+        if parsed["date"] is not None:
+            self.date_var.set(parsed["date"])
+        
+        def fill(start):
+            end = min(start + LOAD_CHUNK_ROWS, len(people))
+            try:
+                store.extend(people[start:end], cells[start * store.days:end * store.days])
+            except Exception as e:
+                # Close the undo step and take it back, restoring the previous attendees
+                self.loading = False
+                self.controller.undo_history.end()
+                self.controller.undo_history.undo()
+                self.status_var.set("")
+                self.update_display()
+                messagebox.showerror("Error", f"Failed to load file:\n{str(e)}")
+                return
+            if end < len(people):
+                self.status_var.set(format_progress("Loading", end, len(people)))
+                self.after(1, fill, end)
+                return
             
-            # Load attendee data
-            for row in ws.iter_rows(min_row=4, values_only=True):
-                if not row[0]:
-                    continue
-                    
-                name, email, sap = row[0], row[1], row[2]
-                self.controller.name_data.append((name, email, sap))
-                
-                attendance_vars = []
-                for status in row[3:34]:  # First 31 days
-                    var = tk.IntVar(value=1 if status == "Present" else 0)
-                    attendance_vars.append(var)
-                self.controller.attendance_data[name] = attendance_vars
+            self.loading = False
+            self.controller.undo_history.end()
+            self.status_var.set("")
+            self.update_display()
+            messagebox.showinfo("Success", f"Loaded {len(people)} attendees from:\n{file_path}")
+            if parsed["errors"]:
+                lines = [f"Row {row}: {reason}" for row, reason in parsed["errors"][:20]]
+                if len(parsed["errors"]) > 20:
+                    lines.append(f"... and {len(parsed['errors']) - 20} more")
+                messagebox.showwarning("Skipped rows",
+                                       f"{len(parsed['errors'])} malformed rows were skipped:\n"
+                                       + "\n".join(lines))
+        
+        fill(0)
+    
+    def replace_store(self, store):
+        """Replace the model with another store's rows as one undo step"""
+        history = self.controller.undo_history
+        history.begin()
+        try:
+            self.controller.store.clear()
+            self.controller.store.extend(store.people, store.cells)
+        finally:
+            history.end()
+    
+    def selected_period(self):
+        """Return (year, month number) from the Date and Month fields"""
+        return sheet_period(self.month_var.get(), self.date_var.get())
+    
+    def save_to_database(self):
+        """Write the cells changed since the last database save"""
+        if not self.controller.store:
+            messagebox.showwarning("Warning", "No attendance data to save")
+            return
+        
+        database = self.controller.get_database()
+        if database is None:
+            return
+        
+        try:
+            written = database.save(self.controller.store, *self.selected_period())
+            self.status_var.set(f"Saved {written} changed cells to {os.path.basename(database.path)}")
+        except (ValueError, sqlite3.Error) as e:
+            messagebox.showerror("Error", f"Failed to save to database:\n{str(e)}")
+    
+    def load_from_database(self):
+        """Replace the current data with the selected month from the database"""
+        if self.busy():
+            return
+        database = self.controller.get_database()
+        if database is None:
+            return
+        
+        try:
+            store = database.load(*self.selected_period())
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Failed to load from database:\n{str(e)}")
+            return
+        
+        self.replace_store(store)
+        self.update_display()
+        self.status_var.set(f"Loaded {len(store)} attendees from {os.path.basename(database.path)}")
+    
+    def archive_month(self):
+        """Write the selected month into the history store"""
+        if not self.controller.store:
+            messagebox.showwarning("Warning", "No attendance data to archive")
+            return
+        
+        year, month = self.selected_period()
+        try:
+            self.controller.get_history().save_month(year, month, self.controller.store)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to archive month:\n{str(e)}")
+            return
+        self.status_var.set(f"Archived {MONTHS[month - 1]} {year} to history")
+    
+    def import_folder(self):
+        """Parse and merge every workbook in a folder in parallel"""
+        directory = filedialog.askdirectory(
+            initialdir=self.controller.settings["default_save_path"],
+            title="Import Folder of Attendance Sheets"
+        )
+        if not directory:
+            return
+        if self.controller.store and not messagebox.askyesno(
+                "Confirm", "Replace the current attendees with the merged folder?"):
+            return
+        
+        def done(result):
+            merged, report = result
+            self.status_var.set("")
+            if not report:
+                messagebox.showwarning("Warning", "No attendance sheets found in that folder")
+                return
+            if self.busy():
+                return
             
+            self.replace_store(merged)
+            self.update_display()
+            lines = format_import_report(report)
+            if len(lines) > 25:
+                lines = lines[:20] + ["..."] + lines[-2:]
+            messagebox.showinfo("Import Complete", "\n".join(lines))
+        
+        def failed(e):
+            self.status_var.set("")
+            messagebox.showerror("Error", f"Failed to import folder:\n{str(e)}")
+        
+        BackgroundTask(self, lambda progress: bulk_import(directory, progress=progress),
+                       done, failed,
+                       lambda n, total: self.status_var.set(f"Importing... {n}/{total} files"))
+    
+    def merge_sheets(self):
+        """Merge separately edited copies of the sheet into the current data"""
+        files = filedialog.askopenfilenames(
+            initialdir=self.controller.settings["default_save_path"],
+            filetypes=SHEET_FILETYPES,
+            title="Merge Attendance Sheets"
+        )
+        if not files:
+            return
+        rule = next(key for key, label in RULES.items() if label == self.merge_rule_var.get())
+        
+        # Plan against a snapshot; the plan is applied here on the Tk thread
+        store = self.controller.store
+        base, roster_version = store.copy(), store.roster_version
+        
+        def done(plan):
+            self.status_var.set("")
+            if self.busy():
+                return
+            if store.roster_version != roster_version:
+                messagebox.showerror("Error", "The roster changed while merging. Please merge again.")
+                return
+            history = self.controller.undo_history
+            history.begin()
+            try:
+                apply_merge(store, plan)
+            finally:
+                history.end()
             self.update_display()
-            messagebox.showinfo("Success", f"Loaded attendance from:\n{file_path}")
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load file:\n{str(e)}")
+            lines = format_merge_report(plan)
+            if len(lines) > 25:
+                lines = lines[:20] + ["..."] + lines[-2:]
+            if not plan["conflicts"]:
+                messagebox.showinfo("Merge Complete", "\n".join(lines))
+                return
+            if not messagebox.askyesno("Merge Complete", "\n".join(lines) + "\n\nSave the conflict report?"):
+                return
+            file_path = filedialog.asksaveasfilename(
+                initialdir=self.controller.settings["default_save_path"],
+                defaultextension=".csv",
+                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+                title="Save Conflict Report"
+            )
+            if file_path:
+                try:
+                    write_conflict_report(file_path, plan)
+                except OSError as e:
+                    messagebox.showerror("Error", f"Failed to save conflict report:\n{str(e)}")
+        
+        def failed(e):
+            self.status_var.set("")
+            messagebox.showerror("Error", f"Failed to merge sheets:\n{str(e)}")
+        
+        BackgroundTask(self, lambda progress: plan_merge(base, list(files), rule, progress=progress),
+                       done, failed,
+                       lambda n, total: self.status_var.set(f"Merging... {n}/{total} files"))
     
     def on_show(self):
         """Called when the frame is shown"""
@@ -416,6 +1198,8 @@ class ReportsPage(tk.Frame):
         scrollbar.pack(side="right", fill="y")
         self.summary_text.config(yscrollcommand=scrollbar.set)
         self.summary_text.pack(fill="both", expand=True)
+        self.summary_text.tag_configure("header", font=('Arial', 10, 'bold'))
+        self.shown_report = None  # Segments currently in summary_text
         
         # Export buttons
         button_frame = ttk.Frame(self.content)
@@ -425,67 +1209,107 @@ class ReportsPage(tk.Frame):
                   ).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Generate Report", command=self.generate_report
                   ).pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Email Low Attendance", command=self.email_low_attendance).pack(side="left", padx=5)
         ttk.Button(button_frame, text="Print", command=self.print_report
                   ).pack(side="left", padx=5)
-    
-    def update_report(self):
-        """Update the report display with current data"""
-        self.summary_text.config(state="normal")
-        self.summary_text.delete(1.0, tk.END)
         
-        summary = self.controller.get_attendance_summary()
-        if not summary:
-            self.summary_text.insert(tk.END, "No attendance data available.")
-            self.summary_text.config(state="disabled")
-            return
+        self.status_var = tk.StringVar()
+        ttk.Label(button_frame, textvariable=self.status_var).pack(side="left", padx=10)
         
-        # Calculate overall statistics
-        total_days = summary[0]['total'] if summary else 0
-        total_present = sum(item['present'] for item in summary)
-        total_possible = total_days * len(summary) if summary else 1
-        overall_percentage = (total_present / total_possible) * 100 if total_possible > 0 else 0
+        # History range query
+        history_frame = ttk.LabelFrame(self.content, text="History", padding=10)
+        history_frame.pack(fill="x", pady=10)
         
-        # Add header
-        self.summary_text.insert(tk.END, f"ATTENDANCE REPORT\n", "header")
-        self.summary_text.insert(tk.END, f"Date: {datetime.now().strftime('%Y-%m-%d')}\n")
-        self.summary_text.insert(tk.END, f"Total attendees: {len(summary)}\n")
-        self.summary_text.insert(tk.END, f"Total days recorded: {total_days}\n")
-        self.summary_text.insert(tk.END, f"Overall attendance: {overall_percentage:.1f}%\n\n")
+        ttk.Label(history_frame, text="SAP ID (blank for all):").grid(row=0, column=0, sticky="e", padx=5)
+        self.history_sap_var = tk.StringVar()
+        ttk.Entry(history_frame, textvariable=self.history_sap_var, width=14).grid(row=0, column=1, padx=5)
         
-        # Add individual records
-        self.summary_text.insert(tk.END, "INDIVIDUAL RECORDS:\n", "header")
-        for item in summary:
-            self.summary_text.insert(tk.END, 
-                                   f"{item['name']}: {item['present']}/{item['total']} days ({item['percentage']:.1f}%)\n")
+        ttk.Label(history_frame, text="From:").grid(row=0, column=2, sticky="e", padx=5)
+        self.history_from_var = tk.StringVar(value=datetime.now().strftime("%Y-01-01"))
+        ttk.Entry(history_frame, textvariable=self.history_from_var, width=12).grid(row=0, column=3, padx=5)
+        
+        ttk.Label(history_frame, text="To:").grid(row=0, column=4, sticky="e", padx=5)
+        self.history_to_var = tk.StringVar(value=datetime.now().strftime("%Y-%m-%d"))
+        ttk.Entry(history_frame, textvariable=self.history_to_var, width=12).grid(row=0, column=5, padx=5)
+        
+        ttk.Button(history_frame, text="Query", command=self.query_history).grid(row=0, column=6, padx=5)
+    
+    def query_history(self):
+        """Show attendance between two dates from the history store"""
+        try:
+            start = datetime.strptime(self.history_from_var.get(), "%Y-%m-%d").date()
+            end = datetime.strptime(self.history_to_var.get(), "%Y-%m-%d").date()
+        except ValueError:
+            messagebox.showerror("Error", "Dates must be in YYYY-MM-DD format")
+            return
         
+        history = self.controller.get_history()
+        sap = self.history_sap_var.get().strip()
+        try:
+            results = [history.person_range(sap, start, end)] if sap else history.roster_range(start, end)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Failed to read history:\n{str(e)}")
+            return
+        
+        self.summary_text.config(state="normal")
+        self.summary_text.delete(1.0, tk.END)
+        self.summary_text.insert(tk.END, f"HISTORY {start} to {end}\n", "header")
+        results = [item for item in results if item["total"]]
+        if not results:
+            self.summary_text.insert(tk.END, "No archived attendance in this range.")
+        for item in results:
+            self.summary_text.insert(tk.END, 
+                                   f"{item['name']} ({item['sap']}): {item['present']}/{item['total']} days "
+                                   f"({item['percentage']:.1f}%)\n")
         self.summary_text.tag_configure("header", font=('Arial', 10, 'bold'))
         self.summary_text.config(state="disabled")
+        self.shown_report = None  # The report is no longer on screen
+    
+    @timed("update_report")
+    def update_report(self):
+        """Update the report display, unless it already shows the current data"""
+        threshold = self.controller.settings["low_attendance_threshold"]
+        report = self.controller.cached(("report", threshold), self.render_report)
+        if report is self.shown_report:
+            return
+        
+        self.summary_text.config(state="normal")
+        self.summary_text.delete(1.0, tk.END)
+        for text, tag in report:
+            self.summary_text.insert(tk.END, text, tag)
+        self.summary_text.config(state="disabled")
+        self.shown_report = report
+    
+    def render_report(self):
+        """Build the report text as (text, tag) segments"""
+        summary = self.controller.get_attendance_summary()
+        if not summary:
+            return [("No attendance data available.", "")]
+        
+        # Header and overall statistics
+        overall = self.controller.get_overall_statistics()
+        report = [
+            ("ATTENDANCE REPORT\n", "header"),
+            (f"Date: {datetime.now().strftime('%Y-%m-%d')}\n"
+             f"Total attendees: {len(summary)}\n"
+             f"Total days recorded: {overall['total_days']}\n"
+             f"Overall attendance: {overall['percentage']:.1f}%\n\n", ""),
+            ("INDIVIDUAL RECORDS:\n", "header"),
+            ("".join(format_summary_line(item) + "\n" for item in summary), "")
+        ]
+        
+        # Roster-wide statistics
+        for heading, lines in format_analytics(self.controller.get_analytics()):
+            report.append((f"\n{heading}\n", "header"))
+            report.append(("".join(line + "\n" for line in lines), ""))
+        return report
     
     def export_to_excel(self):
-        """Export the report to Excel"""
+        """Export the report to Excel on a background thread"""
         summary = self.controller.get_attendance_summary()
         if not summary:
             messagebox.showwarning("Warning", "No data to export")
             return
-            
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Attendance Report"
-        
-        # Add headers
-        ws['A1'] = "Attendance Report"
-        ws['A2'] = f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        ws['A4'] = "Name"
-        ws['B4'] = "Present Days"
-        ws['C4'] = "Total Days"
-        ws['D4'] = "Percentage"
-        
-        # Add data
-        for row, item in enumerate(summary, start=5):
-            ws.cell(row=row, column=1, value=item['name'])
-            ws.cell(row=row, column=2, value=item['present'])
-            ws.cell(row=row, column=3, value=item['total'])
-            ws.cell(row=row, column=4, value=item['percentage'])
         
         # Save file
         default_path = self.controller.settings["default_save_path"]
@@ -496,12 +1320,64 @@ class ReportsPage(tk.Frame):
             title="Save Report"
         )
         
-        if file_path:
-            try:
-                wb.save(file_path)
-                messagebox.showinfo("Success", f"Report saved to:\n{file_path}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save report:\n{str(e)}")
+        if not file_path:
+            return
+        
+        generated_on = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        analytics = self.controller.get_analytics()
+        
+        def done(_):
+            self.status_var.set("")
+            messagebox.showinfo("Success", f"Report saved to:\n{file_path}")
+        
+        def failed(e):
+            self.status_var.set("")
+            messagebox.showerror("Error", f"Failed to save report:\n{str(e)}")
+        
+        BackgroundTask(self, lambda progress: write_report_workbook(file_path, summary, generated_on, progress,
+                                                                    analytics),
+                       done, failed,
+                       lambda n, total: self.status_var.set(format_progress("Exporting", n, total)))
+    
+    def email_low_attendance(self):
+        """Email everyone below the threshold, sending on a background thread"""
+        settings = self.controller.settings
+        if not settings["smtp_sender"]:
+            messagebox.showwarning("Warning", "Set the sender address and SMTP server in Settings first")
+            return
+        # The same list as the report's, counting the month's calendar days
+        below = self.controller.get_analytics()["below_threshold"]
+        threshold = settings["low_attendance_threshold"]
+        if not below:
+            messagebox.showinfo("Info", f"Nobody is below {threshold:.0f}% attendance")
+            return
+        if not messagebox.askyesno("Confirm", f"Email the {len(below)} attendees below {threshold:.0f}% attendance?"):
+            return
+        
+        people = list(self.controller.store.people)
+        month = self.controller.sheet_meta()["month"]
+        smtp_settings = dict(settings)
+        
+        def done(result):
+            sent, failed, no_email = result
+            self.status_var.set("")
+            lines = [f"Sent {sent} emails."]
+            if no_email:
+                lines.append(f"{len(no_email)} attendees have no email address: {', '.join(map(str, no_email[:10]))}")
+            if failed:
+                lines.append(f"{len(failed)} could not be sent:")
+                lines += [f"{address}: {reason}" for address, reason in failed[:10]]
+            (messagebox.showwarning if failed else messagebox.showinfo)("Email Complete", "\n".join(lines))
+        
+        def failed(e):
+            self.status_var.set("")
+            messagebox.showerror("Error", f"Failed to send emails:\n{str(e)}")
+        
+        from attendance_notify import notify_low_attendance
+        BackgroundTask(self, lambda progress: notify_low_attendance(below, people, month, threshold,
+                                                                    smtp_settings, progress),
+                       done, failed,
+                       lambda n, total: self.status_var.set(f"Sending... {n}/{total} emails"))
     
     def generate_report(self):
         """Generate a printable report"""
@@ -531,6 +1407,7 @@ class SettingsPage(tk.Frame):
                   command=lambda: controller.show_frame("MainMenu")).pack(side="left", padx=10)
         
         ttk.Label(header, text="Settings", style="Title.TLabel").pack(side="left", expand=True)
+        self.performance_panel = None  # Opened on demand
         
         # Content
         self.content = ttk.Frame(self)
@@ -561,10 +1438,47 @@ class SettingsPage(tk.Frame):
         ttk.Combobox(form_frame, textvariable=self.theme_var, 
                     values=["light", "dark"], state="readonly").grid(row=1, column=1, sticky="w", padx=5, pady=5)
         
+        # Database file
+        ttk.Label(form_frame, text="Database File:").grid(row=2, column=0, sticky="e", padx=5, pady=5)
+        self.database_path_var = tk.StringVar(value=self.controller.settings["database_path"])
+        ttk.Entry(form_frame, textvariable=self.database_path_var, width=40).grid(row=2, column=1, sticky="w", padx=5, pady=5)
+        ttk.Button(form_frame, text="Browse...", command=self.browse_database_path).grid(row=2, column=2, padx=5, pady=5)
+        
+        # Low-attendance email
+        ttk.Label(form_frame, text="SMTP Server:").grid(row=3, column=0, sticky="e", padx=5, pady=5)
+        self.smtp_host_var = tk.StringVar(value=self.controller.settings["smtp_host"])
+        ttk.Entry(form_frame, textvariable=self.smtp_host_var, width=40).grid(row=3, column=1, sticky="w", padx=5, pady=5)
+        ttk.Label(form_frame, text="SMTP Port:").grid(row=4, column=0, sticky="e", padx=5, pady=5)
+        self.smtp_port_var = tk.IntVar(value=self.controller.settings["smtp_port"])
+        ttk.Spinbox(form_frame, from_=1, to=65535, textvariable=self.smtp_port_var, width=8).grid(row=4, column=1, sticky="w", padx=5, pady=5)
+        ttk.Label(form_frame, text="Sender Email:").grid(row=5, column=0, sticky="e", padx=5, pady=5)
+        self.smtp_sender_var = tk.StringVar(value=self.controller.settings["smtp_sender"])
+        ttk.Entry(form_frame, textvariable=self.smtp_sender_var, width=40).grid(row=5, column=1, sticky="w", padx=5, pady=5)
+        ttk.Label(form_frame, text="SMTP Username:").grid(row=6, column=0, sticky="e", padx=5, pady=5)
+        self.smtp_username_var = tk.StringVar(value=self.controller.settings["smtp_username"])
+        ttk.Entry(form_frame, textvariable=self.smtp_username_var, width=40).grid(row=6, column=1, sticky="w", padx=5, pady=5)
+        ttk.Label(form_frame, text="SMTP Password:").grid(row=7, column=0, sticky="e", padx=5, pady=5)
+        self.smtp_password_var = tk.StringVar(value=self.controller.settings["smtp_password"])
+        ttk.Entry(form_frame, textvariable=self.smtp_password_var, show="*", width=40).grid(row=7, column=1, sticky="w", padx=5, pady=5)
+        ttk.Label(form_frame, text="(this session only)").grid(row=7, column=2, sticky="w", padx=5, pady=5)
+        self.smtp_starttls_var = tk.BooleanVar(value=self.controller.settings["smtp_starttls"])
+        ttk.Checkbutton(form_frame, text="Use STARTTLS", variable=self.smtp_starttls_var).grid(row=8, column=1, sticky="w", padx=5, pady=5)
+        ttk.Label(form_frame, text="Emails per Second:").grid(row=9, column=0, sticky="e", padx=5, pady=5)
+        self.smtp_rate_var = tk.DoubleVar(value=self.controller.settings["smtp_rate"])
+        ttk.Spinbox(form_frame, from_=0.1, to=100, increment=0.5, textvariable=self.smtp_rate_var, width=8).grid(row=9, column=1, sticky="w", padx=5, pady=5)
+        
+        # Undo history size
+        ttk.Label(form_frame, text="Undo Steps:").grid(row=10, column=0, sticky="e", padx=5, pady=5)
+        self.undo_steps_var = tk.IntVar(value=self.controller.settings["undo_steps"])
+        ttk.Spinbox(form_frame, from_=1, to=10000, textvariable=self.undo_steps_var, width=8).grid(row=10, column=1, sticky="w", padx=5, pady=5)
+        
         # Save button
         button_frame = ttk.Frame(form_frame)
-        button_frame.grid(row=2, column=0, columnspan=3, pady=10)
+        button_frame.grid(row=11, column=0, columnspan=3, pady=10)
         ttk.Button(button_frame, text="Save Settings", command=self.save_settings).pack(pady=10)
+        
+        # Diagnostics
+        ttk.Button(self.content, text="Performance Panel", command=self.open_performance_panel).pack(anchor="w")
     
     def browse_save_path(self):
         """Browse for a default save path"""
@@ -572,17 +1486,159 @@ class SettingsPage(tk.Frame):
         if path:
             self.save_path_var.set(path)
     
+    def browse_database_path(self):
+        """Browse for the SQLite database file"""
+        path = filedialog.asksaveasfilename(
+            initialdir=self.save_path_var.get(),
+            defaultextension=".db",
+            filetypes=[("SQLite database", "*.db"), ("All files", "*.*")],
+            confirmoverwrite=False
+        )
+        if path:
+            self.database_path_var.set(path)
+    
     def save_settings(self):
         """Save the current settings"""
         self.controller.settings["default_save_path"] = self.save_path_var.get()
         self.controller.settings["theme"] = self.theme_var.get()
+        self.controller.settings["database_path"] = self.database_path_var.get()
+        self.controller.settings["smtp_host"] = self.smtp_host_var.get()
+        try:
+            self.controller.settings["smtp_port"] = self.smtp_port_var.get()
+        except tk.TclError:
+            messagebox.showerror("Error", "SMTP port must be a number")
+            return
+        self.controller.settings["smtp_sender"] = self.smtp_sender_var.get()
+        self.controller.settings["smtp_username"] = self.smtp_username_var.get()
+        self.controller.settings["smtp_password"] = self.smtp_password_var.get()  # Not written to disk
+        self.controller.settings["smtp_starttls"] = self.smtp_starttls_var.get()
+        try:
+            rate = self.smtp_rate_var.get()
+        except tk.TclError:
+            rate = 0
+        if rate <= 0:
+            messagebox.showerror("Error", "Emails per second must be a positive number")
+            return
+        self.controller.settings["smtp_rate"] = rate
+        try:
+            self.controller.settings["undo_steps"] = self.undo_steps_var.get()
+        except tk.TclError:
+            messagebox.showerror("Error", "Undo steps must be a number")
+            return
+        self.controller.configure_undo()
+        try:
+            self.controller.save_settings()
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save settings:\n{str(e)}")
+            return
         messagebox.showinfo("Success", "Settings saved successfully!")
     
+    def open_performance_panel(self):
+        """Open the performance panel, or raise it if already open"""
+        panel = self.performance_panel
+        if panel is not None and panel.winfo_exists():
+            panel.lift()
+            return
+        self.performance_panel = PerformancePanel(self.controller)
+    
     def on_show(self):
         """Called when the frame is shown"""
         self.save_path_var.set(self.controller.settings["default_save_path"])
         self.theme_var.set(self.controller.settings["theme"])
+        self.database_path_var.set(self.controller.settings["database_path"])
+        self.smtp_host_var.set(self.controller.settings["smtp_host"])
+        self.smtp_port_var.set(self.controller.settings["smtp_port"])
+        self.smtp_sender_var.set(self.controller.settings["smtp_sender"])
+
+def count_widgets(widget):
+    """Count a widget and all of its descendants"""
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+class PerformancePanel(tk.Toplevel):
+    """Window showing hot-path timings and widget counts"""
+    REFRESH_MS = 1000
+    
+    def __init__(self, controller):
+        tk.Toplevel.__init__(self, controller)
+        self.controller = controller
+        self.title("Performance")
+        self.geometry("640x420")
+        
+        controls = ttk.Frame(self, padding=10)
+        controls.pack(fill="x")
+        self.enabled_var = tk.BooleanVar(value=PERF.enabled)
+        ttk.Checkbutton(controls, text="Record timings", variable=self.enabled_var,
+                        command=self.toggle_recording).pack(side="left", padx=5)
+        ttk.Button(controls, text="Reset", command=self.reset).pack(side="left", padx=5)
+        ttk.Button(controls, text="Save JSON...", command=self.dump).pack(side="left", padx=5)
+        
+        self.stats_text = tk.Text(self, wrap="none", font=('Courier', 10), bg="#f9f9f9", fg="black")
+        self.stats_text.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        
+        self.refresh_id = None  # Pending after() call of the next refresh
+        self.refresh()
+    
+    def toggle_recording(self):
+        PERF.enabled = self.enabled_var.get()
+    
+    def reset(self):
+        PERF.reset()
+        self.refresh()
+    
+    def widget_counts(self):
+        """Return total Tk widgets and canvas items of the attendance grid"""
+        counts = {"widgets": count_widgets(self.controller)}
+        page = self.controller.frames.get("AttendancePage")
+        if page is not None:
+            counts["grid_canvas_items"] = len(page.canvas.find_all())
+        return counts
+    
+    def refresh(self):
+        """Redraw the statistics table, then schedule the next refresh"""
+        self.stats_text.config(state="normal")
+        self.stats_text.delete(1.0, tk.END)
+        if not PERF.enabled:
+            self.stats_text.insert(tk.END, "Timing is off. Tick \"Record timings\" to start.\n\n")
+        self.stats_text.insert(tk.END, f"{'operation':<28}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}\n")
+        for item in PERF.stats():
+            self.stats_text.insert(tk.END, f"{item['name']:<28}{item['count']:>8}{item['p50_ms']:>10.2f}"
+                                           f"{item['p95_ms']:>10.2f}{item['max_ms']:>10.2f}\n")
+        self.stats_text.insert(tk.END, "\n")
+        for name, count in self.widget_counts().items():
+            self.stats_text.insert(tk.END, f"{name}: {count}\n")
+        self.stats_text.config(state="disabled")
+        if self.refresh_id is not None:
+            self.after_cancel(self.refresh_id)  # Reset refreshes early; keep a single timer
+        self.refresh_id = self.after(self.REFRESH_MS, self.refresh)
+    
+    def destroy(self):
+        """Stop refreshing before the window goes away"""
+        if self.refresh_id is not None:
+            self.after_cancel(self.refresh_id)
+            self.refresh_id = None
+        super().destroy()
+    
+    def dump(self):
+        """Save the statistics and widget counts to a JSON file"""
+        file_path = filedialog.asksaveasfilename(
+            initialdir=self.controller.settings["default_save_path"],
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+            title="Save Performance Log",
+            parent=self
+        )
+        if not file_path:
+            return
+        try:
+            PERF.dump(file_path, {"widget_counts": self.widget_counts()})
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save log:\n{str(e)}", parent=self)
 
 if __name__ == "__main__":
     app = AttendanceApp()
+    if "--measure-startup" in sys.argv[1:]:
+        # Runs after first_window_shown; prints time from module load to the first window
+        app.after_idle(lambda: (print(f"Time to first window: {app.startup_seconds * 1000:.0f} ms"),
+                                app.destroy()))
     app.mainloop()
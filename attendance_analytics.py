@@ -0,0 +1,146 @@
+"""Roster-wide attendance statistics computed over the packed matrix.
+
+AttendanceStore keeps one byte per cell, so a day column is a strided
+slice of the cell buffer and a whole column can be turned into one big
+integer with a byte "lane" per person. Every statistic here is built
+from those whole-column operations (slice, count, translate, bitwise
+AND) rather than a Python loop over people x days.
+"""
+import calendar
+
+from attendance_core import present_counts
+from attendance_perf import timed
+
+PERCENTILES = (10, 25, 50, 75, 90)
+ABSENT_TABLE = bytes.maketrans(b"\x00\x01", b"\x01\x00")  # Flip present/absent
+
+
+def day_turnout(store, days):
+    """Return (day, present, percentage) for each day of the month"""
+    people = len(store)
+    turnout = []
+    for day in range(days):
+        present = store.cells[day::store.days].count(1)
+        turnout.append((day + 1, present, (present / people) * 100 if people else 0))
+    return turnout
+
+
+def weekday_breakdown(turnout, year, month, people):
+    """Average turnout percentage per weekday, Monday first"""
+    totals = [[0, 0] for _ in range(7)]  # [day slots, present marks] per weekday
+    for day, present, _ in turnout:
+        weekday = calendar.weekday(year, month, day)
+        totals[weekday][0] += 1
+        totals[weekday][1] += present
+    return [{"weekday": calendar.day_name[weekday], "days": slots,
+             "percentage": (present / (slots * people)) * 100 if slots and people else 0}
+            for weekday, (slots, present) in enumerate(totals)]
+
+
+def absence_streaks(store, days, top):
+    """Return the longest run of consecutive absent days, largest first.
+
+    Each day column becomes an integer with one byte lane per person
+    that is 1 when absent. ANDing a run of L consecutive columns leaves a
+    lane set only for people absent on all L days, so OR-ing those runs
+    over every start day gives everyone with a streak of at least L.
+    """
+    people = len(store)
+    if not people:
+        return []
+    absent = [int.from_bytes(store.cells[day::store.days].translate(ABSENT_TABLE), "little")
+              for day in range(days)]
+
+    # at_least[L - 1] has a lane set for everyone with a streak >= L
+    at_least = []
+    runs = list(absent)
+    for length in range(1, days + 1):
+        if length > 1:
+            runs = [runs[start] & absent[start + length - 1] for start in range(days - length + 1)]
+        combined = 0
+        for run in runs:
+            combined |= run
+        if not combined:
+            break
+        at_least.append(combined)
+
+    longest = []
+    seen = 0
+    for length in range(len(at_least), 0, -1):
+        fresh = at_least[length - 1] & ~seen
+        seen |= fresh
+        while fresh and len(longest) < top:
+            lowest = fresh & -fresh
+            index = (lowest.bit_length() - 1) // 8
+            name, _, sap = store.people[index]
+            longest.append({"name": name, "sap": sap, "days": length})
+            fresh ^= lowest
+        if len(longest) >= top:
+            break
+    return longest
+
+
+def present_percentiles(counts, days):
+    """Nearest-rank percentiles of per-person attendance percentage"""
+    people = len(counts)
+    if not people or not days:
+        return {p: 0 for p in PERCENTILES}
+    histogram = [counts.count(value) for value in range(days + 1)]
+
+    result = {}
+    for p in PERCENTILES:
+        rank = max(1, -(-p * people // 100))  # ceil(p% of people)
+        seen = 0
+        for value, count in enumerate(histogram):
+            seen += count
+            if seen >= rank:
+                result[p] = (value / days) * 100
+                break
+    return result
+
+
+def below_threshold(store, counts, days, threshold):
+    """Summary items, with their row index, of everyone under a percentage threshold"""
+    limit = threshold * days / 100
+    return [{"index": index, "name": store.people[index][0], "sap": store.people[index][2], "present": present,
+             "total": days, "percentage": (present / days) * 100 if days else 0}
+            for index, present in enumerate(counts) if present < limit]
+
+
+@timed("report_analytics")
+def compute_analytics(store, year, month, threshold=75.0, top=10):
+    """Compute every report statistic for a month.
+
+    Only the calendar days of the month are counted, so February has no
+    day 30/31 columns. Per-person percentages below the threshold and
+    the percentiles use each person's present count over those days.
+    """
+    days = min(store.days, calendar.monthrange(year, month)[1])
+    turnout = day_turnout(store, days)
+    counts = present_counts(store, days)
+    return {
+        "days": days,
+        "day_turnout": turnout,
+        "weekdays": weekday_breakdown(turnout, year, month, len(store)),
+        "streaks": absence_streaks(store, days, top),
+        "threshold": threshold,
+        "below_threshold": below_threshold(store, counts, days, threshold),
+        "percentiles": present_percentiles(counts, days)
+    }
+
+
+def format_analytics(analytics):
+    """Format the statistics as (section heading, text lines) pairs"""
+    below = analytics["below_threshold"]
+    return [
+        ("DAILY TURNOUT:", [f"Day {day}: {present} present ({percentage:.1f}%)"
+                            for day, present, percentage in analytics["day_turnout"]]),
+        ("BY WEEKDAY:", [f"{item['weekday']}: {item['percentage']:.1f}% over {item['days']} days"
+                         for item in analytics["weekdays"] if item["days"]]),
+        ("PERCENTILES:", [f"P{p}: {value:.1f}%" for p, value in analytics["percentiles"].items()]),
+        ("LONGEST ABSENCE STREAKS:", [f"{item['name']} ({item['sap']}): {item['days']} days"
+                                      for item in analytics["streaks"]]),
+        (f"BELOW {analytics['threshold']:.0f}% ({len(below)} attendees):",
+         [f"{item['name']} ({item['sap']}): {item['present']}/{item['total']} days ({item['percentage']:.1f}%)"
+          for item in below])
+    ]
@@ -0,0 +1,311 @@
+"""Command line interface for batch attendance work without Tk.
+
+Examples:
+    python attendance_cli.py summary sheet.xlsx
+    python attendance_cli.py import sheet.xlsx --db attendance.db
+    python attendance_cli.py export attendance.db --month 2024-03 -o march.xlsx
+    python attendance_cli.py export march.xlsx -o march.attc
+    python attendance_cli.py report attendance.db --month 2024-03 -o report.xlsx
+    python attendance_cli.py bulk-import departments/ -o merged.xlsx
+    python attendance_cli.py merge march.xlsx copies/*.xlsx --rule latest --report conflicts.csv -o merged.xlsx
+    python attendance_cli.py serve attendance.db --month 2024-03 --host 0.0.0.0
+    python attendance_cli.py notify attendance.db --month 2024-03 --sender office@example.com
+    python attendance_cli.py smtp-stand-in --port 1025
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from attendance_core import (
+    MONTHS, SHEET_FORMATS, AttendanceStore, SQLiteBackend, format_summary_line, read_attendance_file, sheet_year,
+    update_date, write_attendance_file, write_report_workbook
+)
+from attendance_merge import RULES
+
+
+def parse_month(text):
+    """Parse a YYYY-MM argument into (year, month)"""
+    try:
+        parsed = datetime.strptime(text, "%Y-%m")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {text!r}")
+    return parsed.year, parsed.month
+
+
+def sheet_period(parsed):
+    """Return (year, month) from a parsed sheet's Month and Date cells"""
+    try:
+        month = MONTHS.index(parsed["month"]) + 1
+        return sheet_year(month, parsed["date"]), month
+    except ValueError:
+        raise SystemExit("Cannot tell the sheet's month from its Month/Date cells; pass --month")
+
+
+def is_sheet(path):
+    """True for .xlsx, .csv and .attc sheets, False for a database"""
+    return os.path.splitext(path)[1].lower() in SHEET_FORMATS
+
+
+def load_source(path, period):
+    """Load a store from an .xlsx, .csv or .attc sheet or a SQLite database.
+
+    Returns (store, month name, date) and reports malformed sheet rows on
+    stderr. A database month is dated today if it is the current month,
+    else on its last day.
+    """
+    if is_sheet(path):
+        parsed = read_attendance_file(path)
+        for row, reason in parsed["errors"]:
+            print(f"{path}: skipped row {row}: {reason}", file=sys.stderr)
+        store = AttendanceStore()
+        store.extend(parsed["people"], parsed["cells"])
+        return store, parsed["month"], parsed["date"]
+
+    if period is None:
+        raise SystemExit(f"{path}: --month is required when reading a database")
+    database = SQLiteBackend(path)
+    try:
+        store = database.load(*period)
+    finally:
+        database.close()
+    return store, MONTHS[period[1] - 1], update_date(*period)
+
+
+def cmd_import(args):
+    parsed = read_attendance_file(args.sheet)
+    for row, reason in parsed["errors"]:
+        print(f"{args.sheet}: skipped row {row}: {reason}", file=sys.stderr)
+
+    store = AttendanceStore()
+    store.extend(parsed["people"], parsed["cells"])
+    period = args.month or sheet_period(parsed)
+
+    database = SQLiteBackend(args.db)
+    try:
+        written = database.save(store, *period)
+    finally:
+        database.close()
+    print(f"Imported {len(store)} attendees ({written} cells) into {args.db} for {period[0]}-{period[1]:02d}")
+
+
+def cmd_export(args):
+    store, month, date = load_source(args.source, args.month)
+    write_attendance_file(args.output, store, month, date)
+    print(f"Exported {len(store)} attendees to {args.output}")
+
+
+def cmd_summary(args):
+    store, _, _ = load_source(args.source, args.month)
+    for item in store.summary():
+        print(format_summary_line(item))
+
+
+def cmd_report(args):
+    from attendance_analytics import compute_analytics, format_analytics
+
+    store, month, date = load_source(args.source, args.month)
+    year, month = args.month or sheet_period({"month": month, "date": date})
+    analytics = compute_analytics(store, year, month, args.threshold)
+    if args.output:
+        generated_on = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        write_report_workbook(args.output, store.summary(), generated_on, analytics=analytics)
+        print(f"Report saved to {args.output}")
+        return
+
+    overall = store.overall_statistics()
+    print("ATTENDANCE REPORT")
+    print(f"Date: {datetime.now().strftime('%Y-%m-%d')}")
+    print(f"Total attendees: {overall['attendees']}")
+    print(f"Total days recorded: {overall['total_days']}")
+    print(f"Overall attendance: {overall['percentage']:.1f}%")
+    print()
+    print("INDIVIDUAL RECORDS:")
+    for item in store.summary():
+        print(format_summary_line(item))
+    for heading, lines in format_analytics(analytics):
+        print()
+        print(heading)
+        for line in lines:
+            print(line)
+
+
+def cmd_bulk_import(args):
+    from attendance_import import bulk_import, format_import_report
+
+    store, report = bulk_import(args.directory, args.workers)
+    for line in format_import_report(report):
+        print(line)
+    for item in report:
+        for row, reason in item["errors"]:
+            print(f"{item['file']}: skipped row {row}: {reason}", file=sys.stderr)
+
+    if args.db:
+        if args.month is None:
+            raise SystemExit("--month is required when importing into a database")
+        database = SQLiteBackend(args.db)
+        try:
+            database.save(store, *args.month)
+        finally:
+            database.close()
+        print(f"Saved {len(store)} attendees to {args.db}")
+    if args.output:
+        month = report[0]["month"] if report else ""
+        write_attendance_file(args.output, store, month, datetime.now().strftime("%Y-%m-%d"))
+        print(f"Saved {len(store)} attendees to {args.output}")
+
+
+def cmd_merge(args):
+    from attendance_merge import apply_merge, format_merge_report, plan_merge, write_conflict_report
+
+    store, month, date = load_source(args.base, args.month)
+    plan = plan_merge(store, args.copies, args.rule, args.workers)
+    for line in format_merge_report(plan):
+        print(line)
+    for item in plan["files"]:
+        for row, reason in item["errors"]:
+            print(f"{item['file']}: skipped row {row}: {reason}", file=sys.stderr)
+    if args.report:
+        write_conflict_report(args.report, plan)
+        print(f"Conflict report saved to {args.report}")
+
+    apply_merge(store, plan)
+    write_attendance_file(args.output, store, month, date)
+    print(f"Saved {len(store)} attendees to {args.output}")
+
+
+def cmd_notify(args):
+    from attendance_analytics import compute_analytics
+    from attendance_notify import low_attendance_recipients, notify_low_attendance
+
+    store, month, date = load_source(args.source, args.month)
+    year, number = args.month or sheet_period({"month": month, "date": date})
+    # The report's below-threshold list, which counts the month's calendar days
+    below = compute_analytics(store, year, number, args.threshold)["below_threshold"]
+    if args.dry_run:
+        recipients, no_email = low_attendance_recipients(below, store.people)
+        for (_, email, _), item in recipients:
+            print(f"Would email {email}: {format_summary_line(item)}")
+        for name in no_email:
+            print(f"{name} has no email address", file=sys.stderr)
+        return
+
+    settings = {
+        "smtp_host": args.smtp_host, "smtp_port": args.smtp_port, "smtp_username": args.username,
+        "smtp_password": os.environ.get("ATTENDANCE_SMTP_PASSWORD", ""), "smtp_starttls": args.starttls,
+        "smtp_sender": args.sender, "smtp_rate": args.rate
+    }
+    sent, failed, no_email = notify_low_attendance(below, store.people, MONTHS[number - 1], args.threshold, settings)
+    print(f"Sent {sent} emails")
+    for name in no_email:
+        print(f"{name} has no email address", file=sys.stderr)
+    for address, reason in failed:
+        print(f"Could not email {address}: {reason}", file=sys.stderr)
+    if failed:
+        raise SystemExit(1)
+
+
+def cmd_smtp_stand_in(args):
+    from attendance_notify import run_stand_in
+
+    run_stand_in(args.host, args.port)
+
+
+def cmd_serve(args):
+    from attendance_server import serve
+
+    store, month, date = load_source(args.source, args.month)
+    year, month = args.month or sheet_period({"month": month, "date": date})
+    database = args.db or (None if is_sheet(args.source) else args.source)
+    # Without a database the marks are written back to the served sheet on shutdown
+    sheet = args.source if database is None else None
+    serve(store, year, month, args.host, args.port, database, sheet)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Attendance Management System batch tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    month_help = "month to read from a database, as YYYY-MM"
+
+    p = commands.add_parser("import", help="import an attendance sheet into a SQLite database")
+    p.add_argument("sheet")
+    p.add_argument("--db", required=True, help="SQLite database file")
+    p.add_argument("--month", type=parse_month, help="month to store the sheet under (default: from the sheet)")
+    p.set_defaults(func=cmd_import)
+
+    p = commands.add_parser("export", help="write an attendance sheet as .xlsx, .csv or .attc")
+    p.add_argument("source", help=".xlsx, .csv or .attc sheet, or SQLite database")
+    p.add_argument("--month", type=parse_month, help=month_help)
+    p.add_argument("-o", "--output", required=True)
+    p.set_defaults(func=cmd_export)
+
+    p = commands.add_parser("summary", help="print per-attendee attendance")
+    p.add_argument("source", help=".xlsx, .csv or .attc sheet, or SQLite database")
+    p.add_argument("--month", type=parse_month, help=month_help)
+    p.set_defaults(func=cmd_summary)
+
+    p = commands.add_parser("report", help="print the attendance report or save it as .xlsx")
+    p.add_argument("source", help=".xlsx, .csv or .attc sheet, or SQLite database")
+    p.add_argument("--month", type=parse_month, help=month_help)
+    p.add_argument("-o", "--output")
+    p.add_argument("--threshold", type=float, default=75.0, help="list attendees below this percentage")
+    p.set_defaults(func=cmd_report)
+
+    p = commands.add_parser("bulk-import", help="parse and merge a directory of sheets in parallel")
+    p.add_argument("directory")
+    p.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    p.add_argument("--db", help="SQLite database to save the merged sheet to")
+    p.add_argument("--month", type=parse_month, help="month to save under in the database, as YYYY-MM")
+    p.add_argument("-o", "--output", help=".xlsx, .csv or .attc file to save the merged sheet to")
+    p.set_defaults(func=cmd_bulk_import)
+
+    p = commands.add_parser("merge", help="merge separately edited copies of a sheet into it")
+    p.add_argument("base", help="the sheet or database the copies were made from")
+    p.add_argument("copies", nargs="+", help="edited .xlsx, .csv or .attc copies")
+    p.add_argument("--month", type=parse_month, help=month_help)
+    p.add_argument("--rule", choices=list(RULES), default="present",
+                   help="how to settle cells the copies disagree on: present wins, the copy with the "
+                        "latest Date of update wins, or keep the base value and flag it")
+    p.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    p.add_argument("--report", help=".csv file to write the conflicting cells to")
+    p.add_argument("-o", "--output", required=True, help=".xlsx, .csv or .attc file to save the merged sheet to")
+    p.set_defaults(func=cmd_merge)
+
+    p = commands.add_parser("serve", help="serve a month over a local HTTP/JSON API for remote marking")
+    p.add_argument("source", help=".xlsx, .csv or .attc sheet, or SQLite database")
+    p.add_argument("--month", type=parse_month, help=month_help)
+    p.add_argument("--host", default="127.0.0.1", help="address to listen on (0.0.0.0 for the whole LAN)")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--db", help="SQLite database to save marks to (default: the source if it is a database, "
+                                "else marks are written back to the source sheet when the server stops)")
+    p.set_defaults(func=cmd_serve)
+
+    p = commands.add_parser("notify", help="email everyone below the attendance threshold")
+    p.add_argument("source", help=".xlsx, .csv or .attc sheet, or SQLite database")
+    p.add_argument("--month", type=parse_month, help=month_help)
+    p.add_argument("--threshold", type=float, default=75.0, help="email attendees below this percentage")
+    p.add_argument("--sender", required=True, help="From address")
+    p.add_argument("--smtp-host", default="localhost")
+    p.add_argument("--smtp-port", type=int, default=25)
+    p.add_argument("--username", default="", help="SMTP login; the password is read from ATTENDANCE_SMTP_PASSWORD")
+    p.add_argument("--starttls", action="store_true")
+    p.add_argument("--rate", type=float, default=5.0, help="messages per second")
+    p.add_argument("--dry-run", action="store_true", help="list who would be emailed without sending")
+    p.set_defaults(func=cmd_notify)
+
+    p = commands.add_parser("smtp-stand-in", help="run a local SMTP server that prints what it receives")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=1025)
+    p.set_defaults(func=cmd_smtp_stand_in)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
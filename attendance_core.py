@@ -0,0 +1,1269 @@
+"""Tk-free attendance model, persistence and report logic.
+
+The GUI in AttendenceManagementSystem.py and the command line tool in
+attendance_cli.py both build on this module. openpyxl is only imported
+when a workbook is actually read or written.
+"""
+import calendar
+import csv
+import json
+import mmap
+import os
+import sqlite3
+import struct
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime
+
+from attendance_perf import timed
+
+
+MONTHS = ["January", "February", "March", "April", "May", "June",
+          "July", "August", "September", "October", "November", "December"]
+
+STATUS_TEXT = ("Absent", "Present")
+STATUS_VALUES = ("Present", "Absent", None, "")  # Accepted day cells when loading
+PROGRESS_EVERY = 1000  # Rows between progress reports of long-running I/O
+
+
+def sap_key(sap):
+    """Return the lookup key of a SAP ID, or None if it is blank"""
+    return None if sap in (None, "") else str(sap)
+
+
+def present_counts(store, days=None):
+    """Return each person's present count over the first days (default all) as bytes.
+    
+    Summing the day columns as byte-lane integers adds every person's
+    marks in parallel; a lane never exceeds the number of days (at most
+    255), so no lane carries into the next one.
+    """
+    total = 0
+    for day in range(store.days if days is None else days):
+        total += int.from_bytes(store.cells[day::store.days], "little")
+    return total.to_bytes(len(store), "little")
+
+
+class SearchIndex:
+    """Sorted prefix index over a roster's names, name words, emails and SAP IDs.
+
+    A lookup bisects to the first key with the prefix and walks forward
+    only while keys still match, so it costs O(log n + matches).
+    """
+    
+    def __init__(self, people):
+        entries = []
+        for row, (name, email, sap) in enumerate(people):
+            name = str(name or "").lower()
+            terms = {name, str(email or "").lower(), str(sap or "").lower(), *name.split()}
+            entries.extend((term, row) for term in terms if term)
+        entries.sort()
+        self.keys = [term for term, _ in entries]
+        self.rows = [row for _, row in entries]
+    
+    def search(self, prefix):
+        """Return the sorted row indices with a key starting with prefix"""
+        prefix = prefix.lower()
+        matches = set()
+        for i in range(bisect_left(self.keys, prefix), len(self.keys)):
+            if not self.keys[i].startswith(prefix):
+                break
+            matches.add(self.rows[i])
+        return sorted(matches)
+
+
+class AttendanceStore:
+    """Compact people x days attendance matrix with no Tk dependency.
+
+    Every cell is one byte (1 present, 0 absent) in a single flat bytearray
+    laid out row by row, so a person's row or a whole day column can be
+    read with one slice instead of one Tcl variable round-trip per day.
+    Present counts per person and overall are kept up to date on every
+    change, so summaries never need to rescan the matrix.
+    
+    People are looked up by SAP ID through a hash index; non-blank SAP IDs
+    must be unique and adding a duplicate raises ValueError.
+    
+    Every change is reported once to each callable in listeners as
+    listener(method name, keyword arguments), so it can be re-applied
+    later with apply_change (e.g. when replaying a journal).
+    
+    While an undo history is attached as undo, each change also works out
+    its inverse: a list of (method name, keyword arguments) changes that
+    apply_change can run to put the store back. Inverses hold only what
+    the change overwrote, and clear hands its old buffers over instead of
+    copying them.
+    """
+    
+    # Methods whose reported changes apply_change will re-run
+    CHANGES = frozenset(["add_person", "extend", "remove_people", "upsert_people", "update_person",
+                         "clear", "set", "set_many", "merge_marks", "mark_block", "copy_day",
+                         "truncate", "insert_people", "restore_block"])
+    
+    def __init__(self, days=31):
+        self.days = days
+        self.people = []  # Stores (name, email, sap) tuples, one per row
+        self.cells = bytearray()
+        self.present = []  # Running present count per row
+        self.total_present = 0
+        self.rows_by_sap = {}  # sap_key(SAP ID) -> row index
+        self.roster_version = 0  # Bumped on every change to people
+        self.search_index = None  # (roster_version, SearchIndex), built on demand
+        self.version = 0  # Bumped on every roster or attendance change
+        self.listeners = []  # Called as listener(method, kwargs) after each change
+        self.undo = None  # UndoHistory told the inverse of each change, if attached
+    
+    def notify(self, method, inverse=None, **kwargs):
+        """Record a change in version and tell every listener and the undo history about it"""
+        self.version += 1
+        for listener in self.listeners:
+            listener(method, kwargs)
+        if inverse is not None and self.undo is not None:
+            self.undo.record(inverse)
+    
+    def apply_change(self, method, kwargs):
+        """Re-apply a change previously reported to listeners"""
+        if method not in self.CHANGES:
+            raise ValueError(f"Unknown change {method!r}")
+        return getattr(self, method)(**kwargs)
+    
+    def __len__(self):
+        return len(self.people)
+    
+    def add_person(self, name, email, sap, marks=None):
+        """Append a person with optional initial marks and return the row index"""
+        key = sap_key(sap)
+        if key in self.rows_by_sap:
+            raise ValueError(f"SAP ID {key} is already used by {self.people[self.rows_by_sap[key]][0]}")
+        row = bytearray(self.days)
+        if marks:
+            for day, value in enumerate(marks[:self.days]):
+                row[day] = 1 if value else 0
+        count = row.count(1)
+        self.people.append((name, email, sap))
+        self.cells += row
+        self.present.append(count)
+        self.total_present += count
+        if key is not None:
+            self.rows_by_sap[key] = len(self.people) - 1
+        self.roster_version += 1
+        self.notify("add_person", self.inverse_append(len(self.people) - 1),
+                    name=name, email=email, sap=sap, marks=bytes(row))
+        return len(self.people) - 1
+    
+    def extend(self, people, cells):
+        """Append many rows at once from a people list and a matching cell buffer"""
+        length = len(self.people)
+        self.append_rows(people, cells)
+        self.notify("extend", self.inverse_append(length), people=list(people), cells=bytes(cells))
+    
+    def inverse_append(self, length):
+        """Inverse of appending rows to a roster of length rows"""
+        return [("truncate", {"length": length})] if self.undo is not None else None
+    
+    def append_rows(self, people, cells):
+        """Append rows without notifying listeners (shared by extend and upsert)"""
+        days = self.days
+        keys = {}
+        for offset, (name, _, sap) in enumerate(people):
+            key = sap_key(sap)
+            if key is not None and (key in self.rows_by_sap or key in keys):
+                raise ValueError(f"SAP ID {key} is used by more than one attendee")
+            if key is not None:
+                keys[key] = len(self.people) + offset
+        
+        self.rows_by_sap.update(keys)
+        self.roster_version += 1
+        self.people.extend(people)
+        self.cells += cells
+        for start in range(0, len(people) * days, days):
+            count = cells.count(1, start, start + days)
+            self.present.append(count)
+            self.total_present += count
+    
+    def remove_person(self, index):
+        """Remove the person at the given row index"""
+        index = range(len(self.people))[index]
+        inverse = self.inverse_remove([index])
+        self.rows_by_sap.pop(sap_key(self.people[index][2]), None)
+        del self.people[index]
+        del self.cells[index * self.days:(index + 1) * self.days]
+        self.total_present -= self.present.pop(index)
+        
+        # Rows after the removed one move up by one
+        for row in range(index, len(self.people)):
+            key = sap_key(self.people[row][2])
+            if key is not None:
+                self.rows_by_sap[key] = row
+        self.roster_version += 1
+        self.notify("remove_people", inverse, indices=[index])
+    
+    def remove_people(self, indices):
+        """Remove many rows in one pass over the matrix"""
+        drop = set(range(len(self.people))[index] for index in indices)
+        if not drop:
+            return
+        days = self.days
+        inverse = self.inverse_remove(sorted(drop))
+        keep = [row for row in range(len(self.people)) if row not in drop]
+        
+        # Copy the kept cells run by run instead of deleting rows one at a time
+        view = memoryview(self.cells)
+        runs = []
+        start = None
+        for row in keep:
+            if start is None:
+                start = previous = row
+            elif row != previous + 1:
+                runs.append(view[start * days:(previous + 1) * days])
+                start = row
+            previous = row
+        if start is not None:
+            runs.append(view[start * days:(previous + 1) * days])
+        cells = bytearray(b"".join(runs))
+        view.release()
+        
+        self.cells = cells
+        self.people = [self.people[row] for row in keep]
+        self.present = [self.present[row] for row in keep]
+        self.total_present = sum(self.present)
+        self.rows_by_sap = {sap_key(sap): row for row, (_, _, sap) in enumerate(self.people)
+                            if sap_key(sap) is not None}
+        self.roster_version += 1
+        self.notify("remove_people", inverse, indices=sorted(drop))
+    
+    def inverse_remove(self, rows):
+        """Inverse of removing the given sorted rows: their people and cells"""
+        if self.undo is None:
+            return None
+        days = self.days
+        return [("insert_people", {"indices": rows, "people": [self.people[row] for row in rows],
+                                   "cells": b"".join(self.cells[row * days:(row + 1) * days] for row in rows)})]
+    
+    def insert_people(self, indices, people, cells):
+        """Insert rows so they end up at the given sorted row indices (undoes remove_people)"""
+        keys = [sap_key(sap) for _, _, sap in people]
+        if any(key is not None and key in self.rows_by_sap for key in keys):
+            raise ValueError("An inserted SAP ID is already used by another attendee")
+        days = self.days
+        merged = []
+        runs = []
+        view = memoryview(self.cells)
+        source = 0  # Next existing row to copy
+        for offset, index in enumerate(indices):
+            take = index - len(merged)  # Existing rows that come before this one
+            merged.extend(self.people[source:source + take])
+            runs.append(view[source * days:(source + take) * days])
+            source += take
+            merged.append(people[offset])
+            runs.append(cells[offset * days:(offset + 1) * days])
+        merged.extend(self.people[source:])
+        runs.append(view[source * days:])
+        matrix = bytearray(b"".join(runs))
+        view.release()
+        
+        self.cells = matrix
+        self.people = merged
+        self.recount()
+        self.rows_by_sap = {sap_key(sap): row for row, (_, _, sap) in enumerate(self.people)
+                            if sap_key(sap) is not None}
+        self.roster_version += 1
+        inverse = [("remove_people", {"indices": list(indices)})] if self.undo is not None else None
+        self.notify("insert_people", inverse, indices=list(indices), people=list(people), cells=bytes(cells))
+    
+    def truncate(self, length):
+        """Remove every row from length on (undoes appends)"""
+        if length >= len(self.people):
+            return
+        if length == 0:
+            self.clear()
+            return
+        days = self.days
+        inverse = None
+        if self.undo is not None:
+            inverse = [("extend", {"people": self.people[length:], "cells": bytes(self.cells[length * days:])})]
+        for _, _, sap in self.people[length:]:
+            self.rows_by_sap.pop(sap_key(sap), None)
+        del self.people[length:]
+        del self.cells[length * days:]
+        self.total_present -= sum(self.present[length:])
+        del self.present[length:]
+        self.roster_version += 1
+        self.notify("truncate", inverse, length=length)
+    
+    def upsert_people(self, people):
+        """Add new people and update existing ones matched by SAP ID, in one batch.
+
+        Existing people keep their row and marks and take the new name and
+        any non-blank email. Returns (added, updated). Raises ValueError,
+        before changing anything, if the batch repeats a SAP ID.
+        """
+        seen = set()
+        for name, _, sap in people:
+            key = sap_key(sap)
+            if key is not None:
+                if key in seen:
+                    raise ValueError(f"SAP ID {key} appears more than once")
+                seen.add(key)
+        
+        new = []
+        updated = 0
+        inverse = [("truncate", {"length": len(self.people)})] if self.undo is not None else None
+        for name, email, sap in people:
+            index = self.find(sap)
+            if index is None:
+                new.append((name, email, sap))
+                continue
+            old_name, old_email, old_sap = self.people[index]
+            if (name, email or old_email) != (old_name, old_email):
+                if inverse is not None:
+                    inverse.append(("update_person", {"index": index, "name": old_name, "email": old_email,
+                                                      "sap": old_sap}))
+                self.people[index] = (name, email or old_email, old_sap)
+                updated += 1
+        
+        self.append_rows(new, bytearray(len(new) * self.days))
+        self.notify("upsert_people", inverse, people=list(people))
+        return len(new), updated
+    
+    def update_person(self, index, name, email, sap):
+        """Replace a person's name, email and SAP ID"""
+        old_key, key = sap_key(self.people[index][2]), sap_key(sap)
+        if key is not None and self.rows_by_sap.get(key, index) != index:
+            raise ValueError(f"SAP ID {key} is already used by {self.people[self.rows_by_sap[key]][0]}")
+        old_name, old_email, old_sap = self.people[index]
+        self.rows_by_sap.pop(old_key, None)
+        if key is not None:
+            self.rows_by_sap[key] = index
+        self.people[index] = (name, email, sap)
+        self.roster_version += 1
+        inverse = None
+        if self.undo is not None:
+            inverse = [("update_person", {"index": index, "name": old_name, "email": old_email, "sap": old_sap})]
+        self.notify("update_person", inverse, index=index, name=name, email=email, sap=sap)
+    
+    def find(self, sap):
+        """Return the row index of a SAP ID, or None"""
+        return self.rows_by_sap.get(sap_key(sap))
+    
+    def search(self, prefix):
+        """Return the rows whose name, a word of it, email or SAP ID start with prefix"""
+        if self.search_index is None or self.search_index[0] != self.roster_version:
+            self.search_index = (self.roster_version, SearchIndex(self.people))
+        return self.search_index[1].search(prefix)
+    
+    def clear(self):
+        """Remove everyone.
+
+        Fresh containers replace the old ones, so an undo history can keep
+        the old roster and cells as they are rather than copying them.
+        """
+        inverse = None
+        if self.undo is not None and self.people:
+            inverse = [("extend", {"people": self.people, "cells": self.cells})]
+        self.people = []
+        self.cells = bytearray()
+        self.present = []
+        self.total_present = 0
+        self.rows_by_sap = {}
+        self.roster_version += 1
+        self.notify("clear", inverse)
+    
+    def get(self, index, day):
+        """Return 1 if the person was present on the day (0-based), else 0"""
+        return self.cells[index * self.days + day]
+    
+    def set(self, index, day, value):
+        """Set a cell and return True if its value changed"""
+        changed = self.write_cell(index, day, value)
+        if changed:
+            value = 1 if value else 0
+            inverse = [("set", {"index": index, "day": day, "value": value ^ 1})] if self.undo is not None else None
+            self.notify("set", inverse, index=index, day=day, value=value)
+        return changed
+    
+    def set_many(self, marks):
+        """Set many (index, day, value) cells as one change.
+
+        Returns a list of flags telling which marks changed a cell; only
+        those are reported to listeners.
+        """
+        changed = [self.write_cell(index, day, value) for index, day, value in marks]
+        applied = [[index, day, 1 if value else 0] for (index, day, value), flag in zip(marks, changed) if flag]
+        if applied:
+            inverse = None
+            if self.undo is not None:
+                # Latest write first, so a cell written twice ends at its original value
+                flipped = [[index, day, value ^ 1] for index, day, value in reversed(applied)]
+                inverse = [("set_many", {"marks": flipped})]
+            self.notify("set_many", inverse, marks=applied)
+        return changed
+    
+    def write_cell(self, index, day, value):
+        """Set a cell without notifying listeners; True if it changed"""
+        pos = index * self.days + day
+        value = 1 if value else 0
+        if self.cells[pos] == value:
+            return False
+        self.cells[pos] = value
+        delta = 1 if value else -1
+        self.present[index] += delta
+        self.total_present += delta
+        return True
+    
+    def merge_marks(self, index, marks):
+        """Mark a row present on every day marks is set (present wins)"""
+        written = [day for day, value in enumerate(marks[:self.days]) if value and self.write_cell(index, day, 1)]
+        inverse = [("set_many", {"marks": [[index, day, 0] for day in written]})] if self.undo is not None else None
+        self.notify("merge_marks", inverse, index=index, marks=bytes(marks))
+    
+    def mark_block(self, first_day, last_day, value, rows=None):
+        """Set days first_day..last_day (0-based, inclusive) for rows, or everyone.
+
+        Whole-roster marks assign each day column as one strided slice and
+        then recount; a row subset writes one contiguous slice per row.
+        Returns the number of cells written.
+        """
+        days = self.days
+        value = 1 if value else 0
+        width = last_day - first_day + 1
+        inverse = self.inverse_block(first_day, last_day, rows)
+        if rows is None:
+            column = bytes([value]) * len(self.people)
+            for day in range(first_day, last_day + 1):
+                self.cells[day::days] = column
+            self.recount()
+            self.notify("mark_block", inverse, first_day=first_day, last_day=last_day, value=value, rows=None)
+            return width * len(self.people)
+        
+        fill = bytes([value]) * width
+        for row in rows:
+            start = row * days
+            before = self.cells.count(1, start + first_day, start + last_day + 1)
+            self.cells[start + first_day:start + last_day + 1] = fill
+            delta = value * width - before
+            self.present[row] += delta
+            self.total_present += delta
+        self.notify("mark_block", inverse, first_day=first_day, last_day=last_day, value=value, rows=list(rows))
+        return width * len(rows)
+    
+    def copy_day(self, source_day, target_day, rows=None):
+        """Copy one day's marks onto another day for rows, or everyone"""
+        days = self.days
+        inverse = self.inverse_block(target_day, target_day, rows)
+        if rows is None:
+            self.cells[target_day::days] = self.cells[source_day::days]
+            self.recount()
+            self.notify("copy_day", inverse, source_day=source_day, target_day=target_day, rows=None)
+            return len(self.people)
+        
+        for row in rows:
+            self.write_cell(row, target_day, self.cells[row * days + source_day])
+        self.notify("copy_day", inverse, source_day=source_day, target_day=target_day, rows=list(rows))
+        return len(rows)
+    
+    def read_block(self, first_day, last_day, rows=None):
+        """Return days first_day..last_day as restore_block takes them.
+
+        For everyone that is one bytes per day column; for a row subset it
+        is one bytes per row, so either way the copy takes as many slices
+        as mark_block writes.
+        """
+        days = self.days
+        if rows is None:
+            return [bytes(self.cells[day::days]) for day in range(first_day, last_day + 1)]
+        return [bytes(self.cells[row * days + first_day:row * days + last_day + 1]) for row in rows]
+    
+    def inverse_block(self, first_day, last_day, rows):
+        """Inverse of overwriting days first_day..last_day of rows, or everyone"""
+        if self.undo is None:
+            return None
+        rows = None if rows is None else list(rows)
+        return [("restore_block", {"first_day": first_day, "blocks": self.read_block(first_day, last_day, rows),
+                                   "rows": rows})]
+    
+    def restore_block(self, first_day, blocks, rows=None):
+        """Write back days from first_day as returned by read_block (undoes bulk marks)"""
+        days = self.days
+        if rows is None:
+            last_day = first_day + len(blocks) - 1
+        else:
+            last_day = first_day + (len(blocks[0]) if blocks else 1) - 1
+        inverse = self.inverse_block(first_day, last_day, rows)
+        if rows is None:
+            for day, column in enumerate(blocks, first_day):
+                self.cells[day::days] = column
+            self.recount()
+        else:
+            for row, block in zip(rows, blocks):
+                start = row * days + first_day
+                delta = block.count(1) - self.cells.count(1, start, start + len(block))
+                self.cells[start:start + len(block)] = block
+                self.present[row] += delta
+                self.total_present += delta
+        self.notify("restore_block", inverse, first_day=first_day, blocks=list(blocks),
+                    rows=None if rows is None else list(rows))
+    
+    def recount(self):
+        """Recompute every present counter after a bulk change"""
+        self.present = list(present_counts(self))
+        self.total_present = sum(self.present)
+    
+    def toggle(self, index, day):
+        """Flip a cell and return its new value"""
+        pos = index * self.days + day
+        value = self.cells[pos] ^ 1
+        self.cells[pos] = value
+        delta = 1 if value else -1
+        self.present[index] += delta
+        self.total_present += delta
+        inverse = [("set", {"index": index, "day": day, "value": value ^ 1})] if self.undo is not None else None
+        self.notify("set", inverse, index=index, day=day, value=value)
+        return value
+    
+    def row(self, index):
+        """Return a person's marks as bytes, one per day"""
+        return bytes(self.cells[index * self.days:(index + 1) * self.days])
+    
+    def present_count(self, index):
+        """Return the number of days a person was present"""
+        return self.present[index]
+    
+    def copy(self):
+        """Return an independent snapshot, e.g. for handing to a worker thread"""
+        snapshot = AttendanceStore(self.days)
+        snapshot.people = list(self.people)
+        snapshot.cells = bytearray(self.cells)
+        snapshot.present = list(self.present)
+        snapshot.total_present = self.total_present
+        snapshot.rows_by_sap = dict(self.rows_by_sap)
+        return snapshot
+    
+    def summary_item(self, index):
+        """Return the present/total/percentage dictionary for one row"""
+        present_days = self.present[index]
+        percentage = (present_days / self.days) * 100 if self.days > 0 else 0
+        return {
+            "name": self.people[index][0],
+            "present": present_days,
+            "total": self.days,
+            "percentage": percentage
+        }
+    
+    @timed("get_attendance_summary")
+    def summary(self):
+        """Return per-person present/total/percentage dictionaries"""
+        return [self.summary_item(index) for index in range(len(self.people))]
+    
+    def overall_statistics(self):
+        """Return roster-wide attendee, day and present totals"""
+        total_days = self.days if self.people else 0
+        total_possible = total_days * len(self.people)
+        return {
+            "attendees": len(self.people),
+            "total_days": total_days,
+            "total_present": self.total_present,
+            "percentage": (self.total_present / total_possible) * 100 if total_possible > 0 else 0
+        }
+
+
+class ReportCache:
+    """Values derived from a store, memoised per (month, data version).
+    
+    Each month keeps the values computed for its latest version only, and
+    the least recently used months are evicted beyond max_months.
+    """
+    
+    def __init__(self, max_months=12):
+        self.max_months = max_months
+        self.entries = OrderedDict()  # (year, month) -> (version, {name: value})
+    
+    def get(self, period, version, name, compute):
+        """Return the cached value of name, calling compute() on a miss"""
+        entry = self.entries.get(period)
+        if entry is None or entry[0] != version:
+            entry = self.entries[period] = (version, {})
+        self.entries.move_to_end(period)
+        while len(self.entries) > self.max_months:
+            self.entries.popitem(last=False)
+        
+        values = entry[1]
+        if name not in values:
+            values[name] = compute()
+        return values[name]
+    
+    def clear(self):
+        self.entries.clear()
+
+
+def sheet_year(month, date):
+    """Return the year of a sheet for month (1-12) from its "Date of update".
+    
+    Sheets are updated during or after their month, so an update dated
+    in an earlier month than the sheet's (a December sheet updated on 2
+    January) means the sheet is from the year before the update. Raises
+    ValueError if date does not start with a YYYY year.
+    """
+    text = str(date)
+    year = int(text[:4])
+    updated = int(text[5:7]) if text[5:7].isdigit() else month
+    return year - 1 if month > updated else year
+
+
+def format_summary_line(item):
+    """Format one attendee's summary line"""
+    return f"{item['name']}: {item['present']}/{item['total']} days ({item['percentage']:.1f}%)"
+
+
+@timed("save_attendance (xlsx)")
+def write_attendance_workbook(file_path, store, month, date, progress=None):
+    """Stream the attendance sheet to an .xlsx file in write-only mode.
+
+    Rows are appended whole instead of assigned cell by cell, and the
+    layout matches what load_attendance reads back. progress, if given,
+    is called as progress(done, total) every PROGRESS_EVERY rows.
+    """
+    from openpyxl import Workbook
+    
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    
+    # Add headers
+    ws.append(["Month", month])
+    ws.append(["Date of update", date])
+    ws.append(["Name", "Email", "SAP ID"] + list(range(1, store.days + 1)))
+    
+    # Add attendee data
+    total = len(store)
+    for index, (name, email, sap) in enumerate(store.people):
+        ws.append([name, email, sap] + [STATUS_TEXT[value] for value in store.row(index)])
+        if progress and index % PROGRESS_EVERY == 0:
+            progress(index, total)
+    
+    wb.save(file_path)
+    if progress:
+        progress(total, total)
+    return total
+
+
+@timed("export_report (xlsx)")
+def write_report_workbook(file_path, summary, generated_on, progress=None, analytics=None):
+    """Stream the summary report to an .xlsx file in write-only mode.
+
+    analytics, as returned by attendance_analytics.compute_analytics, adds
+    one sheet per statistic after the summary sheet.
+    """
+    from openpyxl import Workbook
+    
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Attendance Report")
+    
+    # Add headers
+    ws.append(["Attendance Report"])
+    ws.append([f"Generated on: {generated_on}"])
+    ws.append([])
+    ws.append(["Name", "Present Days", "Total Days", "Percentage"])
+    
+    # Add data
+    total = len(summary)
+    for index, item in enumerate(summary):
+        ws.append([item['name'], item['present'], item['total'], item['percentage']])
+        if progress and index % PROGRESS_EVERY == 0:
+            progress(index, total)
+    
+    if analytics:
+        ws = wb.create_sheet("Daily Turnout")
+        ws.append(["Day", "Present", "Percentage"])
+        for row in analytics["day_turnout"]:
+            ws.append(list(row))
+        
+        ws = wb.create_sheet("Weekdays")
+        ws.append(["Weekday", "Days", "Percentage"])
+        for item in analytics["weekdays"]:
+            ws.append([item["weekday"], item["days"], item["percentage"]])
+        
+        ws = wb.create_sheet("Percentiles")
+        ws.append(["Percentile", "Percentage"])
+        for p, value in analytics["percentiles"].items():
+            ws.append([p, value])
+        
+        ws = wb.create_sheet("Absence Streaks")
+        ws.append(["Name", "SAP ID", "Longest Absence (days)"])
+        for item in analytics["streaks"]:
+            ws.append([item["name"], item["sap"], item["days"]])
+        
+        ws = wb.create_sheet("Below Threshold")
+        ws.append([f"Below {analytics['threshold']:.0f}%"])
+        ws.append(["Name", "SAP ID", "Present Days", "Total Days", "Percentage"])
+        for item in analytics["below_threshold"]:
+            ws.append([item["name"], item["sap"], item["present"], item["total"], item["percentage"]])
+    
+    wb.save(file_path)
+    if progress:
+        progress(total, total)
+    return total
+
+
+def read_roster_file(file_path):
+    """Read (name, email, SAP ID) rows from a .csv or .xlsx roster.
+
+    The first three columns are used and a first row whose first cell is
+    "Name" is treated as a header. Returns (people, errors) where errors
+    lists (row number, reason) for rows that were skipped.
+    """
+    if file_path.lower().endswith(".xlsx"):
+        from openpyxl import load_workbook
+        
+        wb = load_workbook(file_path, read_only=True)
+        try:
+            rows = [tuple(row) for row in wb.active.iter_rows(values_only=True)]
+        finally:
+            wb.close()
+    else:
+        with open(file_path, newline="", encoding="utf-8-sig") as f:
+            rows = [tuple(row) for row in csv.reader(f)]
+    
+    people, errors = [], []
+    seen = set()
+    for row_number, row in enumerate(rows, start=1):
+        row = tuple(None if cell == "" else cell for cell in row[:3]) + (None,) * (3 - len(row[:3]))
+        if row_number == 1 and str(row[0]).strip().lower() == "name":
+            continue
+        if not any(row):
+            continue
+        name, email, sap = row
+        if not name:
+            errors.append((row_number, "missing name"))
+            continue
+        key = sap_key(sap)
+        if key is not None and key in seen:
+            errors.append((row_number, f"duplicate SAP ID {key}"))
+            continue
+        seen.add(key)
+        people.append((name, email, sap))
+    return people, errors
+
+
+@timed("load_attendance (xlsx)")
+def read_attendance_workbook(file_path, days=31, progress=None):
+    """Parse an attendance sheet in read-only (streaming) mode.
+
+    Returns a dictionary with the sheet's month and date, the parsed
+    people and their packed cells (one byte per day, as AttendanceStore
+    keeps them) and a list of (row number, reason) for rows that were
+    skipped as malformed. Only one row is materialized at a time.
+    """
+    from openpyxl import load_workbook
+    
+    wb = load_workbook(file_path, read_only=True)
+    try:
+        ws = wb.active
+        return parse_sheet_rows(ws.iter_rows(values_only=True), days, ws.max_row or 0, progress)
+    finally:
+        wb.close()
+
+
+def parse_sheet_rows(rows, days, total, progress=None):
+    """Parse the rows of an attendance sheet (.xlsx or .csv layout).
+    
+    Returns the dictionary described in read_attendance_workbook.
+    """
+    parsed = {"month": None, "date": None, "people": [], "cells": bytearray(), "errors": []}
+    seen_saps = set()
+    
+    for row_number, row in enumerate(rows, start=1):
+        if progress and row_number % PROGRESS_EVERY == 0:
+            progress(row_number, total)
+        
+        # Metadata and header rows
+        if row_number < 4:
+            if row_number == 1 and len(row) > 1:
+                parsed["month"] = row[1]
+            elif row_number == 2 and len(row) > 1:
+                parsed["date"] = row[1]
+            continue
+        
+        if not row or not row[0]:
+            continue
+        if len(row) < 3:
+            parsed["errors"].append((row_number, "missing Email/SAP ID columns"))
+            continue
+        
+        statuses = row[3:3 + days]
+        unknown = [status for status in statuses if status not in STATUS_VALUES]
+        if unknown:
+            parsed["errors"].append((row_number, f"unrecognized status {unknown[0]!r}"))
+            continue
+        
+        key = sap_key(row[2])
+        if key is not None and key in seen_saps:
+            parsed["errors"].append((row_number, f"duplicate SAP ID {key}"))
+            continue
+        seen_saps.add(key)
+        
+        marks = bytearray(days)
+        for day, status in enumerate(statuses):
+            if status == "Present":
+                marks[day] = 1
+        parsed["people"].append((row[0], row[1], row[2]))
+        parsed["cells"] += marks
+    
+    if progress:
+        progress(total, total)
+    return parsed
+
+
+@timed("save_attendance (csv)")
+def write_attendance_csv(file_path, store, month, date, progress=None):
+    """Stream the attendance sheet to a .csv file in the .xlsx layout"""
+    total = len(store)
+    with open(file_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Month", month])
+        writer.writerow(["Date of update", date])
+        writer.writerow(["Name", "Email", "SAP ID"] + list(range(1, store.days + 1)))
+        for start in range(0, total, PROGRESS_EVERY):
+            end = min(start + PROGRESS_EVERY, total)
+            writer.writerows([name, email, sap, *map(STATUS_TEXT.__getitem__, store.row(index))]
+                             for index, (name, email, sap) in enumerate(store.people[start:end], start))
+            if progress:
+                progress(end, total)
+    return total
+
+
+@timed("load_attendance (csv)")
+def read_attendance_csv(file_path, days=31, progress=None):
+    """Parse a .csv attendance sheet one row at a time; see read_attendance_workbook"""
+    total = 0
+    if progress:
+        with open(file_path, "rb") as f:
+            total = sum(block.count(b"\n") for block in iter(lambda: f.read(1 << 20), b""))
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        return parse_sheet_rows(csv.reader(f), days, total, progress)
+
+
+COLUMNAR_MAGIC = b"ATC1"
+COLUMNAR_HEADER = struct.Struct("<4sBI")  # magic, day columns, people
+COLUMNAR_BLOCK_ROWS = 65536  # People per roster/marks block
+BLOCK_LENGTH = struct.Struct("<I")
+
+
+def pack_day_masks(cells, days, count, width=None):
+    """Pack count rows of one-byte cells into little-endian 32-bit day bitmasks.
+    
+    Each day column is widened to one 32-bit lane per person and OR-ed in
+    at its bit position, so packing costs one big-integer operation per
+    day rather than one Python step per cell. Only the first width day
+    columns (default: all days) are packed.
+    """
+    lanes = bytearray(4 * count)
+    packed = 0
+    for day in range(days if width is None else min(width, days)):
+        lanes[0::4] = cells[day::days]
+        packed |= int.from_bytes(lanes, "little") << day
+    return packed.to_bytes(4 * count, "little")
+
+
+def unpack_day_masks(masks, count, days, stored_days):
+    """Turn count day bitmasks back into one-byte cells with days columns"""
+    packed = int.from_bytes(masks, "little")
+    ones = int.from_bytes(b"\x01\x00\x00\x00" * count, "little")
+    cells = bytearray(count * days)
+    for day in range(min(days, stored_days)):
+        cells[day::days] = ((packed >> day) & ones).to_bytes(4 * count, "little")[0::4]
+    return cells
+
+
+def write_json_block(f, value):
+    data = json.dumps(value, default=str).encode("utf-8")
+    f.write(BLOCK_LENGTH.pack(len(data)))
+    f.write(data)
+
+
+def read_exactly(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("The columnar attendance file is truncated")
+    return data
+
+
+def read_json_block(f):
+    length, = BLOCK_LENGTH.unpack(read_exactly(f, BLOCK_LENGTH.size))
+    return json.loads(read_exactly(f, length))
+
+
+@timed("save_attendance (columnar)")
+def write_attendance_columnar(file_path, store, month, date, progress=None):
+    """Stream the attendance sheet to the compact binary columnar format.
+    
+    After a header and a JSON block with the month and date, people are
+    written in blocks of COLUMNAR_BLOCK_ROWS: a JSON block with the name,
+    email and SAP ID columns, then one 32-bit day bitmask per person
+    (bit 0 is day 1), as in the history files.
+    """
+    days = store.days
+    if days > 32:
+        raise ValueError("The columnar format holds at most 32 days")
+    total = len(store)
+    with open(file_path, "wb") as f:
+        f.write(COLUMNAR_HEADER.pack(COLUMNAR_MAGIC, days, total))
+        write_json_block(f, {"month": month, "date": date})
+        for start in range(0, total, COLUMNAR_BLOCK_ROWS):
+            end = min(start + COLUMNAR_BLOCK_ROWS, total)
+            names, emails, saps = zip(*store.people[start:end])
+            write_json_block(f, {"name": names, "email": emails, "sap": saps})
+            f.write(pack_day_masks(store.cells[start * days:end * days], days, end - start))
+            if progress:
+                progress(end, total)
+    return total
+
+
+@timed("load_attendance (columnar)")
+def read_attendance_columnar(file_path, days=31, progress=None):
+    """Parse a columnar attendance file a block at a time; see read_attendance_workbook.
+    
+    Rows are checked as parse_sheet_rows checks sheet rows: rows without a
+    name are skipped and repeated SAP IDs are reported in errors (by row
+    number in the file) and left out. Blocks that do not add up to the
+    header's row count raise ValueError.
+    """
+    with open(file_path, "rb") as f:
+        magic, stored_days, total = COLUMNAR_HEADER.unpack(read_exactly(f, COLUMNAR_HEADER.size))
+        if magic != COLUMNAR_MAGIC:
+            raise ValueError(f"{file_path} is not a columnar attendance file")
+        meta = read_json_block(f)
+        parsed = {"month": meta["month"], "date": meta["date"], "people": [], "cells": bytearray(),
+                  "errors": []}
+        seen_saps = set()
+        read = 0
+        while read < total:
+            roster = read_json_block(f)
+            count = len(roster["sap"])
+            if not count or len(roster["name"]) != count or len(roster["email"]) != count or read + count > total:
+                raise ValueError(f"{file_path} is damaged: its blocks do not match its row count")
+            cells = unpack_day_masks(read_exactly(f, 4 * count), count, days, stored_days)
+            
+            keep = []
+            for offset, person in enumerate(zip(roster["name"], roster["email"], roster["sap"])):
+                if not person[0]:
+                    continue
+                key = sap_key(person[2])
+                if key is not None and key in seen_saps:
+                    parsed["errors"].append((read + offset + 1, f"duplicate SAP ID {key}"))
+                    continue
+                seen_saps.add(key)
+                parsed["people"].append(person)
+                keep.append(offset)
+            if len(keep) == count:
+                parsed["cells"] += cells
+            else:
+                parsed["cells"] += b"".join(cells[offset * days:(offset + 1) * days] for offset in keep)
+            read += count
+            if progress:
+                progress(read, total)
+        if f.read(1):
+            raise ValueError(f"{file_path} is damaged: it has data past its last row")
+    return parsed
+
+
+SHEET_FORMATS = {  # Extension -> (reader, writer)
+    ".xlsx": (read_attendance_workbook, write_attendance_workbook),
+    ".csv": (read_attendance_csv, write_attendance_csv),
+    ".attc": (read_attendance_columnar, write_attendance_columnar)
+}
+SHEET_FILETYPES = [("Excel files", "*.xlsx"), ("CSV files", "*.csv"),
+                   ("Columnar attendance files", "*.attc"), ("All files", "*.*")]
+
+
+def sheet_format(file_path):
+    """Return the (reader, writer) for a sheet file's extension"""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in SHEET_FORMATS:
+        raise ValueError(f"Unsupported sheet format {ext or file_path!r}; use .xlsx, .csv or .attc")
+    return SHEET_FORMATS[ext]
+
+
+def read_attendance_file(file_path, days=31, progress=None):
+    """Parse an attendance sheet in the format its extension names"""
+    return sheet_format(file_path)[0](file_path, days, progress)
+
+
+def write_attendance_file(file_path, store, month, date, progress=None):
+    """Write an attendance sheet in the format its extension names"""
+    return sheet_format(file_path)[1](file_path, store, month, date, progress)
+
+
+def month_dates(year, month, days):
+    """Return the ISO dates of a month's day slots that exist in the calendar"""
+    days = min(days, calendar.monthrange(year, month)[1])
+    return [f"{year:04d}-{month:02d}-{day:02d}" for day in range(1, days + 1)]
+
+
+def update_date(year, month):
+    """Return a "Date of update" inside a month: today during it, else its last day.
+    
+    sheet_year reads the year back from this date, so a sheet written for
+    a past month is not filed under the current year when imported.
+    """
+    today = datetime.now()
+    day = today.day if (today.year, today.month) == (year, month) else calendar.monthrange(year, month)[1]
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+class SQLiteBackend:
+    """Optional SQLite persistence with incremental saves.
+
+    People are keyed by SAP ID and attendance is kept as one
+    (person, date, status) row per cell. The backend remembers what it
+    last saved or loaded for each month, so a save only writes the people
+    and cells that changed since then.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS people (
+            id INTEGER PRIMARY KEY,
+            sap TEXT NOT NULL,
+            name TEXT,
+            email TEXT,
+            position INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_people_sap ON people(sap);
+        CREATE TABLE IF NOT EXISTS attendance (
+            person_id INTEGER NOT NULL REFERENCES people(id),
+            date TEXT NOT NULL,
+            status INTEGER NOT NULL,
+            PRIMARY KEY (person_id, date)
+        );
+        CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance(date);
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self.person_ids = {}  # SAP ID -> people.id
+        self.saved = {}  # (year, month) -> {sap: (name, email, position, marks)}
+    
+    def close(self):
+        self.conn.close()
+    
+    def person_id(self, sap):
+        """Return the people.id of a SAP ID, or None if it was never saved"""
+        if sap not in self.person_ids:
+            row = self.conn.execute("SELECT id FROM people WHERE sap = ?", (sap,)).fetchone()
+            if row is None:
+                return None
+            self.person_ids[sap] = row[0]
+        return self.person_ids[sap]
+    
+    def read_month(self, year, month, days):
+        """Read a month's saved people and marks as {sap: (name, email, position, marks)}"""
+        dates = month_dates(year, month, days)
+        saved = {}
+        rows = self.conn.execute(
+            "SELECT p.id, p.sap, p.name, p.email, p.position, a.date, a.status "
+            "FROM attendance a JOIN people p ON p.id = a.person_id "
+            "WHERE a.date BETWEEN ? AND ?", (dates[0], dates[-1]))
+        for person_id, sap, name, email, position, date, status in rows:
+            self.person_ids[sap] = person_id
+            if sap not in saved:
+                saved[sap] = (name, email, position, bytearray(days))
+            saved[sap][3][int(date[8:]) - 1] = status
+        return {sap: (name, email, position, bytes(marks))
+                for sap, (name, email, position, marks) in saved.items()}
+    
+    def load(self, year, month, days=31):
+        """Load a month into a new AttendanceStore, in saved roster order"""
+        saved = self.read_month(year, month, days)
+        self.saved[(year, month)] = saved
+        store = AttendanceStore(days)
+        for sap, (name, email, _, marks) in sorted(saved.items(), key=lambda item: item[1][2]):
+            store.add_person(name, email, sap, marks)
+        return store
+    
+    def save(self, store, year, month):
+        """Write the changes since the last save/load of this month.
+
+        Returns the number of attendance cells written. Raises ValueError
+        if an attendee has no SAP ID or two attendees share one.
+        """
+        dates = month_dates(year, month, store.days)
+        saved = self.saved.get((year, month))
+        if saved is None:
+            saved = self.read_month(year, month, store.days)
+        
+        current = {}
+        for position, (name, email, sap) in enumerate(store.people):
+            if sap in (None, ""):
+                raise ValueError(f"{name} has no SAP ID")
+            sap = str(sap)
+            if sap in current:
+                raise ValueError(f"SAP ID {sap} is used by more than one attendee")
+            current[sap] = (name, email, position, store.row(position))
+        
+        written = 0
+        with self.conn:
+            for sap, (name, email, position, marks) in current.items():
+                before = saved.get(sap)
+                if before is None or before[:3] != (name, email, position):
+                    self.conn.execute(
+                        "INSERT INTO people (sap, name, email, position) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(sap) DO UPDATE SET name = excluded.name, "
+                        "email = excluded.email, position = excluded.position",
+                        (sap, name, email, position))
+                if before is not None and before[3] == marks:
+                    continue
+                
+                person_id = self.person_id(sap)
+                changed = [(person_id, date, marks[day]) for day, date in enumerate(dates)
+                           if before is None or before[3][day] != marks[day]]
+                self.conn.executemany(
+                    "INSERT INTO attendance (person_id, date, status) VALUES (?, ?, ?) "
+                    "ON CONFLICT(person_id, date) DO UPDATE SET status = excluded.status",
+                    changed)
+                written += len(changed)
+            
+            # Attendees removed from the roster lose this month's marks
+            for sap in saved.keys() - current.keys():
+                self.conn.execute("DELETE FROM attendance WHERE person_id = ? AND date BETWEEN ? AND ?",
+                                  (self.person_id(sap), dates[0], dates[-1]))
+        
+        self.saved[(year, month)] = current
+        return written
+
+
+class HistoryStore:
+    """Month-partitioned attendance history on disk.
+
+    Each month is two files in the history directory: YYYY-MM.att holds a
+    small header and one 32-bit day bitmask per person (bit 0 is day 1),
+    and YYYY-MM.json holds the roster in the same row order. Day counts
+    follow the calendar. Queries memory-map one month at a time, so a
+    range over years never holds more than one month of marks in memory.
+    """
+    
+    MAGIC = b"ATT1"
+    HEADER = struct.Struct("<4sBI")  # magic, days in month, people
+    
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.rosters = {}  # (year, month) -> (people, {sap: row}); a few months only
+    
+    def month_path(self, year, month, ext):
+        return os.path.join(self.directory, f"{year:04d}-{month:02d}.{ext}")
+    
+    def months(self):
+        """Return the (year, month) partitions on disk, oldest first"""
+        found = []
+        for filename in os.listdir(self.directory):
+            stem, ext = os.path.splitext(filename)
+            if ext == ".att" and len(stem) == 7 and stem[4] == "-":
+                found.append((int(stem[:4]), int(stem[5:])))
+        return sorted(found)
+    
+    def save_month(self, year, month, store):
+        """Write a month partition from a store, dropping day slots past month end"""
+        days = calendar.monthrange(year, month)[1]
+        masks = pack_day_masks(store.cells, store.days, len(store), days)
+        
+        att_path = self.month_path(year, month, "att")
+        with open(att_path + ".tmp", "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, days, len(store)))
+            f.write(masks)
+        json_path = self.month_path(year, month, "json")
+        with open(json_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"people": store.people}, f, default=str)
+        os.replace(att_path + ".tmp", att_path)
+        os.replace(json_path + ".tmp", json_path)
+        self.rosters.pop((year, month), None)
+    
+    def roster(self, year, month):
+        """Return (people, {sap: row}) for a month, caching a few recent months"""
+        key = (year, month)
+        if key not in self.rosters:
+            with open(self.month_path(year, month, "json"), encoding="utf-8") as f:
+                people = [tuple(person) for person in json.load(f)["people"]]
+            rows = {str(sap): row for row, (_, _, sap) in enumerate(people) if sap not in (None, "")}
+            if len(self.rosters) >= 12:
+                self.rosters.pop(next(iter(self.rosters)))
+            self.rosters[key] = (people, rows)
+        return self.rosters[key]
+    
+    def open_masks(self, year, month):
+        """Memory-map a month and return (days, masks memoryview, mmap)"""
+        with open(self.month_path(year, month, "att"), "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, days, count = self.HEADER.unpack_from(mm)
+        if magic != self.MAGIC:
+            mm.close()
+            raise ValueError(f"{year:04d}-{month:02d} is not an attendance history file")
+        masks = memoryview(mm)[self.HEADER.size:self.HEADER.size + 4 * count].cast("I")
+        return days, masks, mm
+    
+    def load_month(self, year, month):
+        """Load a month partition into an AttendanceStore with calendar days"""
+        people, _ = self.roster(year, month)
+        days, masks, mm = self.open_masks(year, month)
+        try:
+            store = AttendanceStore(days)
+            for person, mask in zip(people, masks):
+                store.add_person(*person, [(mask >> day) & 1 for day in range(days)])
+        finally:
+            masks.release()
+            mm.close()
+        return store
+    
+    def iter_range(self, start, end):
+        """Yield (year, month, day mask) for stored months overlapping [start, end]"""
+        for year, month in self.months():
+            first = datetime(year, month, 1).date()
+            last = first.replace(day=calendar.monthrange(year, month)[1])
+            if last < start or first > end:
+                continue
+            lo = max(start, first).day
+            hi = min(end, last).day
+            yield year, month, ((1 << hi) - 1) & ~((1 << (lo - 1)) - 1)
+    
+    def person_range(self, sap, start, end):
+        """Summarize one SAP ID's attendance between two dates (inclusive)"""
+        sap = str(sap)
+        name, present, total = None, 0, 0
+        for year, month, day_mask in self.iter_range(start, end):
+            people, rows = self.roster(year, month)
+            if sap not in rows:
+                continue
+            row = rows[sap]
+            days, masks, mm = self.open_masks(year, month)
+            try:
+                present += bin(masks[row] & day_mask).count("1")
+            finally:
+                masks.release()
+                mm.close()
+            total += bin(day_mask).count("1")
+            name = people[row][0]
+        percentage = (present / total) * 100 if total > 0 else 0
+        return {"name": name, "sap": sap, "present": present, "total": total,
+                "percentage": percentage}
+    
+    def roster_range(self, start, end):
+        """Summarize every SAP ID seen between two dates, in first-seen order"""
+        totals = {}  # sap -> [name, present, total]
+        for year, month, day_mask in self.iter_range(start, end):
+            people, rows = self.roster(year, month)
+            month_days = bin(day_mask).count("1")
+            days, masks, mm = self.open_masks(year, month)
+            try:
+                for sap, row in rows.items():
+                    entry = totals.setdefault(sap, [people[row][0], 0, 0])
+                    entry[0] = people[row][0]
+                    entry[1] += bin(masks[row] & day_mask).count("1")
+                    entry[2] += month_days
+            finally:
+                masks.release()
+                mm.close()
+        return [{"name": name, "sap": sap, "present": present, "total": total,
+                 "percentage": (present / total) * 100 if total > 0 else 0}
+                for sap, (name, present, total) in totals.items()]
@@ -0,0 +1,99 @@
+"""Parallel bulk import of a directory of attendance sheets.
+
+Each sheet (.xlsx, .csv or .attc) is parsed in its own worker process
+with read_attendance_file, and the results are merged in the parent into
+one AttendanceStore keyed by SAP ID.
+"""
+import os
+import time
+
+from attendance_core import SHEET_FORMATS, AttendanceStore, read_attendance_file
+
+
+def parse_workbook_timed(file_path):
+    """Parse one workbook and return (file path, parsed sheet, seconds)"""
+    start = time.perf_counter()
+    parsed = read_attendance_file(file_path)
+    return file_path, parsed, time.perf_counter() - start
+
+
+def list_workbooks(directory):
+    """Return the sheet files in a directory in sorted (merge) order"""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if os.path.splitext(name)[1].lower() in SHEET_FORMATS and not name.startswith("~$"))
+
+
+def merge_parsed(merged, parsed):
+    """Merge one parsed sheet into a store and return (new, merged, skipped) row counts.
+
+    Rows are matched on SAP ID. A SAP ID seen before keeps its first row
+    position, takes the later file's name and email when they are filled
+    in, and is marked present on any day either copy was present. Rows
+    without a SAP ID cannot be matched and are skipped.
+    """
+    days = merged.days
+    new = duplicates = skipped = 0
+    cells = parsed["cells"]
+    for row, (name, email, sap) in enumerate(parsed["people"]):
+        if sap in (None, ""):
+            skipped += 1
+            continue
+        marks = cells[row * days:(row + 1) * days]
+        index = merged.find(sap)
+        if index is None:
+            merged.add_person(name, email, sap, marks)
+            new += 1
+            continue
+
+        old_name, old_email, old_sap = merged.people[index]
+        merged.update_person(index, name or old_name, email or old_email, old_sap)
+        merged.merge_marks(index, marks)
+        duplicates += 1
+    return new, duplicates, skipped
+
+
+def bulk_import(directory, workers=None, progress=None):
+    """Parse every sheet in a directory in parallel and merge them.
+
+    Files are merged in sorted filename order whatever order the workers
+    finish in, so the result is deterministic. Returns the merged store
+    and a per-file report of dictionaries with the parse time and rows
+    ingested, merged as duplicates or skipped. progress, if given, is
+    called as progress(files done, total files).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    files = list_workbooks(directory)
+    merged = AttendanceStore()
+    report = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for done, (file_path, parsed, seconds) in enumerate(pool.map(parse_workbook_timed, files), start=1):
+            new, duplicates, skipped = merge_parsed(merged, parsed)
+            report.append({
+                "file": os.path.basename(file_path),
+                "month": parsed["month"],
+                "rows": len(parsed["people"]),
+                "new": new,
+                "duplicates": duplicates,
+                "skipped": skipped + len(parsed["errors"]),
+                "errors": parsed["errors"],
+                "seconds": seconds
+            })
+            if progress:
+                progress(done, len(files))
+
+    return merged, report
+
+
+def format_import_report(report):
+    """Format a bulk import report as text lines, one per file plus totals"""
+    lines = [f"{item['file']}: {item['rows']} rows in {item['seconds'] * 1000:.0f} ms "
+             f"({item['new']} new, {item['duplicates']} merged, {item['skipped']} skipped)"
+             for item in report]
+    months = {item["month"] for item in report}
+    lines.append(f"Total: {len(report)} files, {sum(item['rows'] for item in report)} rows, "
+                 f"{sum(item['new'] for item in report)} attendees")
+    if len(months) > 1:
+        lines.append(f"Warning: files cover different months: {', '.join(sorted(map(str, months)))}")
+    return lines
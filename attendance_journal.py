@@ -0,0 +1,169 @@
+"""Crash-safe autosave through an append-only journal of store changes.
+
+Every change an AttendanceStore reports to its listeners is appended to
+the current journal segment as one JSON line, so a change costs one
+small write however big the sheet is. Compaction writes the whole store
+to a snapshot file and then deletes the segments it covers; recovery
+loads the snapshot and replays the segments written after it. A crash
+loses at most the changes made since the last fsync.
+"""
+import base64
+import json
+import os
+import time
+
+from attendance_core import AttendanceStore
+
+SNAPSHOT_NAME = "snapshot.dat"
+SEGMENT_PREFIX = "journal-"
+SEGMENT_SUFFIX = ".log"
+
+
+def encode_value(value):
+    """Make a change argument JSON safe (cell buffers and lists of them become base64)"""
+    if isinstance(value, (bytes, bytearray)):
+        return {"bytes": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, list) and value and isinstance(value[0], (bytes, bytearray)):
+        return {"blocks": [base64.b64encode(block).decode("ascii") for block in value]}
+    return value
+
+
+def decode_value(name, value):
+    """Undo encode_value, restoring roster entries as tuples"""
+    if isinstance(value, dict) and "bytes" in value:
+        return base64.b64decode(value["bytes"])
+    if isinstance(value, dict) and "blocks" in value:
+        return [base64.b64decode(block) for block in value["blocks"]]
+    if name == "people":
+        return [tuple(person) for person in value]
+    return value
+
+
+class Journal:
+    """Append-only change log plus snapshot in one directory.
+
+    Attach record() to AttendanceStore.listeners. Writes are flushed to
+    the OS on every change and fsynced at most every fsync_interval
+    seconds; call sync() from a timer so a quiet period is synced too.
+    """
+
+    def __init__(self, directory, fsync_interval=1.0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        # Never append to an old segment: it may end in a torn line. Segments the
+        # snapshot covers may all be deleted, so read_snapshot moves past those too.
+        self.segment = max((number for number, _ in self.segments()), default=0) + 1
+        self.file = None
+        self.size = 0  # Bytes written since the last compaction
+        self.changes = 0  # Changes recorded since the last compaction
+        self.unsynced = False
+        self.last_sync = time.monotonic()
+
+    def segment_path(self, number):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}")
+
+    def segments(self):
+        """Return (number, path) for each journal segment, oldest first"""
+        found = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                number = name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+                if number.isdigit():
+                    found.append((int(number), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    def record(self, method, kwargs):
+        """Store listener: append one change to the current segment"""
+        line = json.dumps([method, {name: encode_value(value) for name, value in kwargs.items()}],
+                          separators=(",", ":")) + "\n"
+        if self.file is None:
+            self.file = open(self.segment_path(self.segment), "a", encoding="utf-8")
+        self.file.write(line)
+        self.file.flush()
+        self.size += len(line)
+        self.changes += 1
+        self.unsynced = True
+        if time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        """fsync anything written since the last sync"""
+        if self.file is not None and self.unsynced:
+            os.fsync(self.file.fileno())
+        self.unsynced = False
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        self.sync()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def rotate(self):
+        """Start a new segment and return the number of the last one to compact"""
+        self.close()
+        covered = self.segment
+        self.segment += 1
+        self.size = self.changes = 0
+        return covered
+
+    def recover(self, days=31):
+        """Rebuild the store from the snapshot and pending segments.
+
+        Returns (store, meta, changes replayed); meta holds whatever was
+        passed to the last write_snapshot. A torn last line, left by a
+        crash mid-write, ends the replay of its segment.
+        """
+        store, meta, covered = self.read_snapshot(days)
+        replayed = 0
+        for number, path in self.segments():
+            if number <= covered:
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        method, kwargs = json.loads(line)
+                    except ValueError:
+                        break
+                    store.apply_change(method, {name: decode_value(name, value)
+                                                for name, value in kwargs.items()})
+                    replayed += 1
+        return store, meta, replayed
+
+    def read_snapshot(self, days):
+        """Return (store, meta, last covered segment) from the snapshot file.
+
+        New changes go to a segment after the covered one, as a segment
+        numbered at or below it would be skipped by recover().
+        """
+        path = os.path.join(self.directory, SNAPSHOT_NAME)
+        if not os.path.exists(path):
+            return AttendanceStore(days), {}, 0
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            cells = f.read()
+        self.segment = max(self.segment, header["segment"] + 1)
+        store = AttendanceStore(header["days"])
+        store.extend([tuple(person) for person in header["people"]], cells)
+        return store, header["meta"], header["segment"]
+
+    def write_snapshot(self, store, covered, meta=None):
+        """Write store as the snapshot covering segments up to covered.
+
+        Safe to run on a worker thread with a store copy. The snapshot is
+        replaced atomically, and only then are the covered segments
+        deleted, so a crash at any point leaves a recoverable directory.
+        """
+        path = os.path.join(self.directory, SNAPSHOT_NAME)
+        header = {"segment": covered, "days": store.days, "people": store.people, "meta": meta or {}}
+        with open(path + ".tmp", "wb") as f:
+            f.write(json.dumps(header, default=str).encode("utf-8") + b"\n")
+            f.write(store.cells)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+        for number, segment_path in self.segments():
+            if number <= covered:
+                os.remove(segment_path)
@@ -0,0 +1,198 @@
+"""Merge copies of a sheet that were edited separately back into a store.
+
+Incoming rows are hash-joined to the store on SAP ID. For every cell the
+merge counts how many copies say present and how many say absent, as
+byte-lane integers over whole day columns (see attendance_analytics),
+so a file costs one pass over its rows plus a few big-integer operations
+per day. Sheets are parsed in worker processes, but at most a few parsed
+sheets are held at once, so memory stays bounded by the size of the
+store however many files are merged. Up to 255 files can be merged at
+once, so a vote count fits in one byte lane.
+
+Where all copies of a row agree, their value is taken. Where they
+disagree the rule decides:
+
+    present  present wins
+    latest   the copy with the latest "Date of update" wins
+    flag     the store's current value is kept
+
+and the cell is listed in the conflict report either way.
+"""
+import csv
+import os
+from collections import deque
+
+from attendance_core import STATUS_TEXT, read_attendance_file, sap_key
+
+RULES = {"present": "present wins", "latest": "latest edit wins", "flag": "flag conflicts"}
+MAX_FILES = 255  # Vote counts are kept in one-byte lanes
+NONZERO = bytes([0] + [1] * 255)  # translate() table: any count -> 1
+
+
+def parsed_sheets(files, days, workers=None):
+    """Yield (path, parsed sheet) in file order, parsing a few files ahead in worker processes"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    ahead = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for path in files:
+            pending.append((path, pool.submit(read_attendance_file, path, days)))
+            if len(pending) > ahead:
+                path, future = pending.popleft()
+                yield path, future.result()
+        while pending:
+            path, future = pending.popleft()
+            yield path, future.result()
+
+
+def lanes(data):
+    return int.from_bytes(data, "little")
+
+
+def nonzero(value, size):
+    """Turn every non-zero byte lane of value into 1"""
+    return lanes(value.to_bytes(size, "little").translate(NONZERO))
+
+
+def plan_merge(store, files, rule="present", workers=None, progress=None):
+    """Work out how to merge sheet files into store without changing it.
+
+    Returns a plan dictionary for apply_merge: the changed cells of
+    existing rows as (index, day, value) marks, new people and their
+    cells, the conflict list and a per-file report. Run it on a store
+    copy to keep it off the Tk thread.
+    """
+    if rule not in RULES:
+        raise ValueError(f"Unknown merge rule {rule!r}; use one of {', '.join(RULES)}")
+    if len(files) > MAX_FILES:
+        raise ValueError(f"At most {MAX_FILES} files can be merged at once")
+
+    days = store.days
+    base_rows = len(store)
+    people = list(store.people)
+    rows_by_sap = dict(store.rows_by_sap)
+    present_votes = [0] * days  # Per day: copies saying present, one byte lane per row
+    copies = 0  # Copies containing each row, one byte lane per row
+    latest = bytearray(store.cells)  # Each row's marks in its latest copy
+    latest_rank = [None] * base_rows  # (date of update, file order) of that copy
+    latest_file = [None] * base_rows
+    report = []
+
+    for number, (path, parsed) in enumerate(parsed_sheets(files, days, workers), start=1):
+        rank = (str(parsed["date"] or ""), number)
+        cells = parsed["cells"]
+        placed = bytearray(len(people) * days)  # This copy's marks in merged row order
+        has = bytearray(len(people))
+        matched = new = skipped = 0
+        for row, person in enumerate(parsed["people"]):
+            key = sap_key(person[2])
+            if key is None:
+                skipped += 1
+                continue
+            index = rows_by_sap.get(key)
+            if index is None:
+                index = rows_by_sap[key] = len(people)
+                people.append(person)
+                latest += bytes(days)
+                latest_rank.append(None)
+                latest_file.append(None)
+                placed += bytes(days)
+                has.append(0)
+                new += 1
+            else:
+                matched += 1
+            marks = cells[row * days:(row + 1) * days]
+            placed[index * days:(index + 1) * days] = marks
+            has[index] = 1
+            if latest_rank[index] is None or rank >= latest_rank[index]:
+                latest[index * days:(index + 1) * days] = marks
+                latest_rank[index] = rank
+                latest_file[index] = os.path.basename(path)
+
+        copies += lanes(has)
+        for day in range(days):
+            present_votes[day] += lanes(placed[day::days])
+        report.append({"file": os.path.basename(path), "date": parsed["date"], "rows": len(parsed["people"]),
+                       "matched": matched, "new": new, "skipped": skipped + len(parsed["errors"]),
+                       "errors": parsed["errors"]})
+        if progress:
+            progress(number, len(files))
+
+    return resolve(store, rule, people, present_votes, copies, latest, latest_file, report)
+
+
+def resolve(store, rule, people, present_votes, copies, latest, latest_file, report):
+    """Apply the merge rule to the vote counts and build the plan"""
+    days = store.days
+    base_rows = len(store)
+    size = len(people)
+    plan = {"rule": rule, "marks": [], "people": people[base_rows:], "cells": bytearray((size - base_rows) * days),
+            "conflicts": [], "files": report}
+
+    for day in range(days):
+        votes = present_votes[day]
+        present = nonzero(votes, size)
+        absent = nonzero(copies - votes, size)  # Lane-wise: no lane of votes exceeds copies
+        conflict = present & absent
+        base = lanes(store.cells[day::days])
+        if rule == "present":
+            winner = present
+        elif rule == "latest":
+            winner = lanes(latest[day::days])
+        else:
+            winner = base
+        result = (present & ~absent) | (base & ~(present | absent)) | (conflict & winner)
+        values = result.to_bytes(size, "little")
+
+        # Changed cells of existing rows, found by scanning the XOR bytes
+        changed = (result ^ base).to_bytes(size, "little")
+        index = changed.find(1, 0, base_rows)
+        while index != -1:
+            plan["marks"].append((index, day, values[index]))
+            index = changed.find(1, index + 1, base_rows)
+        plan["cells"][day::days] = values[base_rows:]
+
+        flagged = conflict.to_bytes(size, "little")
+        votes = votes.to_bytes(size, "little")
+        totals = copies.to_bytes(size, "little")
+        index = flagged.find(1)
+        while index != -1:
+            name, _, sap = people[index]
+            plan["conflicts"].append({
+                "name": name, "sap": sap, "day": day + 1,
+                "present": votes[index], "absent": totals[index] - votes[index],
+                "result": STATUS_TEXT[values[index]],
+                "latest_file": latest_file[index]
+            })
+            index = flagged.find(1, index + 1)
+
+    plan["conflicts"].sort(key=lambda item: (str(item["sap"]), item["day"]))
+    return plan
+
+
+def apply_merge(store, plan):
+    """Apply a plan made by plan_merge; returns (cells changed, people added)"""
+    if plan["marks"]:
+        store.set_many(plan["marks"])
+    if plan["people"]:
+        store.extend(plan["people"], plan["cells"])
+    return len(plan["marks"]), len(plan["people"])
+
+
+def format_merge_report(plan):
+    """Format a merge plan as text lines, one per file plus totals"""
+    lines = [f"{item['file']}: {item['rows']} rows ({item['matched']} matched, {item['new']} new, "
+             f"{item['skipped']} skipped)" for item in plan["files"]]
+    lines.append(f"{len(plan['marks'])} cells changed, {len(plan['people'])} attendees added, "
+                 f"{len(plan['conflicts'])} conflicting cells ({RULES[plan['rule']]})")
+    return lines
+
+
+def write_conflict_report(file_path, plan):
+    """Write the conflicting cells of a merge plan to a .csv file"""
+    with open(file_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "SAP ID", "Day", "Copies present", "Copies absent", "Result", "Latest copy"])
+        writer.writerows([item["name"], item["sap"], item["day"], item["present"], item["absent"],
+                          item["result"], item["latest_file"] or ""] for item in plan["conflicts"])
@@ -0,0 +1,254 @@
+"""Low-attendance email notifications.
+
+Everyone under the threshold in a summary gets one rendered message.
+The messages are sent over one SMTP connection that is reused until
+the server drops it or MESSAGES_PER_CONNECTION is reached, at most
+rate messages per second, retrying transient failures with exponential
+backoff. Nothing here touches Tk, so the GUI runs send_notifications on
+a worker thread and the CLI can run it from a weekly scheduled job.
+
+SMTPStandIn is a minimal local SMTP server that accepts every message
+and keeps it in memory, for trying the pipeline without a mail server.
+"""
+import asyncio
+import smtplib
+import time
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+
+MESSAGES_PER_CONNECTION = 100  # Reconnect after this many, as many servers cap a session
+RETRIES = 3
+SUBJECT = "Attendance below {threshold:.0f}% for {month}"
+BODY = """Dear {name},
+
+Your attendance for {month} is {present}/{total} days ({percentage:.1f}%),
+which is below the required {threshold:.0f}%.
+
+Please contact your coordinator if this is not correct.
+"""
+
+
+def low_attendance_recipients(below, people):
+    """Return (person, summary item) for everyone below threshold with an email address.
+
+    below is compute_analytics()'s "below_threshold" list, so the figures
+    count the month's calendar days just as the report does. Returns the
+    recipients and the names of those skipped for having no usable
+    address.
+    """
+    recipients, no_email = [], []
+    for item in below:
+        name, email, sap = people[item["index"]]
+        if email and "@" in str(email):
+            recipients.append(((name, str(email).strip(), sap), item))
+        else:
+            no_email.append(name)
+    return recipients, no_email
+
+
+def render_messages(recipients, sender, month, threshold):
+    """Render one EmailMessage per recipient"""
+    messages = []
+    for (name, email, _), item in recipients:
+        fields = dict(item, name=name, month=month, threshold=threshold)
+        message = EmailMessage()
+        message["From"] = sender
+        message["To"] = email
+        message["Subject"] = SUBJECT.format(**fields)
+        message["Date"] = formatdate(localtime=True)
+        message["Message-ID"] = make_msgid()
+        message.set_content(BODY.format(**fields))
+        messages.append(message)
+    return messages
+
+
+class RateLimiter:
+    """Space calls at least 1/rate seconds apart (no limit if rate is falsy)"""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1 / rate if rate else 0
+        self.clock = clock
+        self.sleep = sleep
+        self.next_time = 0.0
+
+    def wait(self):
+        now = self.clock()
+        if now < self.next_time:
+            self.sleep(self.next_time - now)
+            now = self.next_time
+        self.next_time = now + self.interval
+
+
+class SMTPConnection:
+    """One SMTP session, opened on first use and reused across messages"""
+
+    def __init__(self, host, port, username="", password="", starttls=False, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.smtp = None
+        self.sent = 0  # Messages sent on the current session
+
+    def send(self, message):
+        if self.smtp is None or self.sent >= MESSAGES_PER_CONNECTION:
+            self.close()
+            self.smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                self.smtp.starttls()
+            if self.username:
+                self.smtp.login(self.username, self.password)
+        self.smtp.send_message(message)
+        self.sent += 1
+
+    def close(self):
+        """Quit the session, dropping it quietly if the server already has"""
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self.smtp.close()
+        self.smtp = None
+        self.sent = 0
+
+
+def is_transient(error):
+    """True for failures worth retrying: dropped connections and 4xx replies"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+def send_notifications(messages, connection, rate=5.0, retries=RETRIES, backoff=1.0, progress=None,
+                       sleep=time.sleep):
+    """Send messages over connection, rate limited, retrying transient failures.
+
+    A transient failure closes the session, waits backoff * 2**attempt
+    seconds and tries again on a fresh one. Returns the number sent and
+    a list of (address, reason) for messages that could not be sent.
+    progress, if given, is called as progress(done, total).
+    """
+    limiter = RateLimiter(rate, sleep=sleep)
+    sent, failed = 0, []
+    try:
+        for done, message in enumerate(messages, start=1):
+            for attempt in range(retries + 1):
+                limiter.wait()
+                try:
+                    connection.send(message)
+                    sent += 1
+                    break
+                except (smtplib.SMTPException, OSError) as e:
+                    connection.close()
+                    if not is_transient(e) or attempt == retries:
+                        failed.append((message["To"], str(e)))
+                        break
+                    sleep(backoff * 2 ** attempt)
+            if progress:
+                progress(done, len(messages))
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def notify_low_attendance(below, people, month, threshold, settings, progress=None):
+    """Render and send the warnings for one month using the SMTP settings.
+
+    Returns (sent, failed, names skipped for having no email).
+    """
+    recipients, no_email = low_attendance_recipients(below, people)
+    messages = render_messages(recipients, settings["smtp_sender"], month, threshold)
+    connection = SMTPConnection(settings["smtp_host"], int(settings["smtp_port"]), settings["smtp_username"],
+                                settings["smtp_password"], settings["smtp_starttls"])
+    sent, failed = send_notifications(messages, connection, float(settings["smtp_rate"]), progress=progress)
+    return sent, failed, no_email
+
+
+class SMTPStandIn:
+    """Accept every message on a local port and keep it in messages.
+
+    Speaks just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA,
+    RSET, NOOP and QUIT. Each message is stored as (sender, recipients,
+    raw bytes).
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=1025):
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    async def handle(self, reader, writer):
+        def reply(line):
+            writer.write(line.encode("ascii") + b"\r\n")
+
+        sender, recipients = None, []
+        reply("220 attendance SMTP stand-in ready")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8", "replace").strip()
+                verb = command[:4].upper()
+                if verb in ("EHLO", "HELO"):
+                    reply("250 attendance")
+                elif verb == "MAIL":
+                    sender, recipients = command[10:].strip(), []
+                    reply("250 OK")
+                elif verb == "RCPT":
+                    recipients.append(command[8:].strip())
+                    reply("250 OK")
+                elif verb == "DATA":
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while True:
+                        data = await reader.readline()
+                        if data in (b".\r\n", b".\n", b""):
+                            break
+                        lines.append(data[1:] if data.startswith(b"..") else data)
+                    self.messages.append((sender, recipients, b"".join(lines)))
+                    sender, recipients = None, []
+                    reply("250 OK")
+                elif verb == "RSET":
+                    sender, recipients = None, []
+                    reply("250 OK")
+                elif verb == "NOOP":
+                    reply("250 OK")
+                elif verb == "QUIT":
+                    reply("221 Bye")
+                    break
+                else:
+                    reply("502 Command not implemented")
+                await writer.drain()
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def run_stand_in(host="127.0.0.1", port=1025):
+    """Run an SMTPStandIn until interrupted, printing each message received"""
+    async def main():
+        stand_in = SMTPStandIn()
+        await stand_in.start(host, port)
+        print(f"SMTP stand-in listening on {host}:{port}", flush=True)
+        shown = 0
+        while True:
+            await asyncio.sleep(0.2)
+            for sender, recipients, data in stand_in.messages[shown:]:
+                print(f"--- from {sender} to {', '.join(recipients)}")
+                print(data.decode("utf-8", "replace"), flush=True)
+            shown = len(stand_in.messages)
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,83 @@
+"""Lightweight timing hooks for the attendance hot paths.
+
+Functions wrapped with @timed("name") are timed into the shared PERF
+recorder. While it is disabled (the default) the wrapper only checks one
+flag before calling through, so the hooks can stay on the hot paths.
+"""
+import functools
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+class PerfRecorder:
+    """Call counts and recent latencies per named operation"""
+
+    def __init__(self, max_samples=1000):
+        self.enabled = False
+        self.max_samples = max_samples
+        self.counts = {}  # name -> calls while enabled
+        self.samples = {}  # name -> deque of recent durations in seconds
+        self.lock = threading.Lock()  # Save/load record from worker threads
+
+    def record(self, name, seconds):
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.max_samples)
+                self.counts[name] = 0
+            self.samples[name].append(seconds)
+            self.counts[name] += 1
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+            self.samples.clear()
+
+    def stats(self):
+        """Return count, p50, p95 and max (milliseconds) for each operation"""
+        with self.lock:
+            items = [(name, self.counts[name], sorted(samples)) for name, samples in self.samples.items()]
+        stats = []
+        for name, count, ordered in sorted(items):
+            stats.append({
+                "name": name,
+                "count": count,
+                "p50_ms": percentile(ordered, 50) * 1000,
+                "p95_ms": percentile(ordered, 95) * 1000,
+                "max_ms": ordered[-1] * 1000
+            })
+        return stats
+
+    def dump(self, file_path, extra=None):
+        """Write the current statistics, plus any extra fields, as JSON"""
+        data = {"timestamp": datetime.now().isoformat(timespec="seconds"), "operations": self.stats()}
+        data.update(extra or {})
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted, non-empty list"""
+    rank = max(1, -(-p * len(ordered) // 100))
+    return ordered[rank - 1]
+
+
+PERF = PerfRecorder()
+
+
+def timed(name, recorder=PERF):
+    """Decorator recording each call's duration under name while enabled"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not recorder.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                recorder.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
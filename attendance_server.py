@@ -0,0 +1,289 @@
+"""Local HTTP/JSON API so kiosks and phones can mark attendance at once.
+
+Runs on asyncio with a small HTTP/1.1 reader (keep-alive, JSON bodies),
+so it needs nothing beyond the standard library. Endpoints:
+
+    GET  /roster[?q=prefix]   the roster, optionally narrowed by a search
+    GET  /summary[?sap=ID]    overall statistics and per-attendee summary
+    POST /mark                {"sap": ..., "date": "YYYY-MM-DD", "present": true}
+
+Marks are queued rather than applied one at a time: the first mark of a
+batch schedules a flush BATCH_MS later, which applies every queued mark
+with one AttendanceStore.set_many call before those requests are
+answered. Database saves are coalesced the same way, at most one every
+persist_seconds, on a writer thread that owns the SQLite connection.
+When the month is served from a sheet file rather than a database, the
+marks are written back to that sheet when the server stops.
+"""
+import asyncio
+import json
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+from attendance_core import MONTHS, SQLiteBackend, update_date, write_attendance_file
+
+BATCH_MS = 5  # How long the first mark of a batch waits for others
+MAX_BODY = 64 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large"}
+
+
+class HTTPError(Exception):
+    """An error answered with the given status and a JSON message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_request(reader):
+    """Read one request as (method, path, query, headers, body); None at end of stream"""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HTTPError(400, "Bad Content-Length")
+    if length > MAX_BODY:
+        raise HTTPError(413, f"Request bodies are limited to {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+
+    url = urlsplit(target)
+    query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+    return method, url.path, query, headers, body
+
+
+def encode_response(status, payload, keep_alive):
+    body = json.dumps(payload, default=str).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+class AttendanceServer:
+    """Serve one month of a store over HTTP, batching marks and saves"""
+
+    def __init__(self, store, year, month, database_path=None, persist_seconds=1.0, sheet_path=None):
+        self.store = store
+        self.year = year
+        self.month = month
+        self.database_path = database_path
+        self.sheet_path = sheet_path  # Sheet to write the marks back to on close
+        self.sheet_dirty = False  # Marks applied since the sheet was read
+        self.persist_seconds = persist_seconds
+        self.pending = []  # (index, day, present, future) waiting for the next flush
+        self.flush_handle = None
+        self.dirty = False  # Marks applied since the last database save began
+        self.persisting = None  # Task running persist_loop, if any
+        self.last_persist = 0.0
+        self.database = None
+        self.writer = ThreadPoolExecutor(max_workers=1)  # Owns the SQLite connection
+        self.server = None
+
+    async def start(self, host, port):
+        loop = asyncio.get_running_loop()
+        if self.database_path:
+            self.database = await loop.run_in_executor(self.writer, SQLiteBackend, self.database_path)
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+
+    async def close(self):
+        """Stop accepting requests, apply queued marks and finish the last save"""
+        self.server.close()
+        await self.server.wait_closed()
+        self.flush()
+        if self.persisting is not None:
+            await self.persisting
+        loop = asyncio.get_running_loop()
+        if self.database is not None:
+            await loop.run_in_executor(self.writer, self.database.close)
+        if self.sheet_path and self.sheet_dirty:
+            try:
+                await loop.run_in_executor(self.writer, self.write_sheet, self.store.copy())
+            except Exception as e:
+                print(f"Failed to write the marks back to {self.sheet_path}: {e}", file=sys.stderr)
+        self.writer.shutdown()
+
+    def write_sheet(self, store):
+        """Replace the served sheet with store, through a temporary file of the same format"""
+        root, ext = os.path.splitext(self.sheet_path)
+        temporary = f"{root}.tmp{ext}"
+        write_attendance_file(temporary, store, MONTHS[self.month - 1], update_date(self.year, self.month))
+        os.replace(temporary, self.sheet_path)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    # The stream can no longer be trusted, so answer and hang up
+                    writer.write(encode_response(e.status, {"error": str(e)}, False))
+                    break
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    status, payload = 200, await self.dispatch(method, path, query, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                writer.write(encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, query, body):
+        routes = {"/roster": ("GET", self.roster), "/summary": ("GET", self.summary),
+                  "/mark": ("POST", self.mark)}
+        if path not in routes:
+            raise HTTPError(404, f"No endpoint {path}")
+        expected, handler = routes[path]
+        if method != expected:
+            raise HTTPError(405, f"{path} only accepts {expected}")
+        if method == "POST":
+            try:
+                request = json.loads(body)
+            except ValueError:
+                raise HTTPError(400, "Body is not valid JSON")
+            if not isinstance(request, dict):
+                raise HTTPError(400, "Body must be a JSON object")
+            return await handler(request)
+        return handler(query)
+
+    def roster(self, query):
+        store = self.store
+        rows = store.search(query["q"]) if query.get("q") else range(len(store))
+        return {"attendees": [dict(zip(("name", "email", "sap"), store.people[row])) for row in rows]}
+
+    def summary(self, query):
+        store = self.store
+        if query.get("sap"):
+            return store.summary_item(self.row_of(query["sap"]))
+        return {"month": MONTHS[self.month - 1], "year": self.year,
+                "overall": store.overall_statistics(), "attendees": store.summary()}
+
+    def row_of(self, sap):
+        index = self.store.find(sap)
+        if index is None:
+            raise HTTPError(404, f"Unknown SAP ID {sap!r}")
+        return index
+
+    def day_of(self, text):
+        """Return the day column of a YYYY-MM-DD date in the served month"""
+        try:
+            date = datetime.strptime(str(text), "%Y-%m-%d")
+        except ValueError:
+            raise HTTPError(400, "date must be YYYY-MM-DD")
+        if (date.year, date.month) != (self.year, self.month):
+            raise HTTPError(400, f"This server only marks {self.year}-{self.month:02d}")
+        return date.day - 1
+
+    async def mark(self, request):
+        """Queue one mark and answer once its batch has been applied"""
+        index = self.row_of(request.get("sap"))
+        date = request.get("date") or datetime.now().strftime("%Y-%m-%d")
+        day = self.day_of(date)
+        present = request.get("present", True)
+        if not isinstance(present, bool):
+            raise HTTPError(400, "present must be true or false")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((index, day, present, future))
+        if self.flush_handle is None:
+            self.flush_handle = loop.call_later(BATCH_MS / 1000, self.flush)
+        changed = await future
+        return {"sap": request["sap"], "date": date, "present": present, "changed": changed}
+
+    def flush(self):
+        """Apply every queued mark as one change and wake their requests"""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        changed = self.store.set_many([(index, day, present) for index, day, present, _ in batch])
+        for (_, _, _, future), flag in zip(batch, changed):
+            if not future.done():  # The client may have gone away
+                future.set_result(flag)
+
+        if any(changed):
+            self.sheet_dirty = True
+        if self.database is not None and any(changed):
+            self.dirty = True
+            if self.persisting is None:
+                self.persisting = asyncio.ensure_future(self.persist_loop())
+
+    async def persist_loop(self):
+        """Save to the database until no marks are left unsaved, at most once per interval"""
+        loop = asyncio.get_running_loop()
+        try:
+            while self.dirty:
+                wait = self.last_persist + self.persist_seconds - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self.dirty = False
+                snapshot = self.store.copy()
+                try:
+                    await loop.run_in_executor(self.writer, self.database.save, snapshot, self.year, self.month)
+                except Exception as e:
+                    print(f"Failed to save to {self.database_path}: {e}", file=sys.stderr)
+                self.last_persist = loop.time()
+        finally:
+            self.persisting = None
+
+
+def serve(store, year, month, host="127.0.0.1", port=8765, database_path=None, sheet_path=None):
+    """Run the server until interrupted or terminated"""
+    async def main():
+        stop = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+        server = AttendanceServer(store, year, month, database_path, sheet_path=sheet_path)
+        await server.start(host, port)
+        print(f"Serving {len(store)} attendees for {year}-{month:02d} on http://{host}:{port}", flush=True)
+        if database_path is None:
+            if sheet_path:
+                print(f"Marks are written back to {sheet_path} when the server stops", flush=True)
+            else:
+                print("Warning: no database or sheet to save to; marks are kept in memory only",
+                      file=sys.stderr, flush=True)
+        try:
+            await stop.wait()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
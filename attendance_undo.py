@@ -0,0 +1,143 @@
+"""Undo and redo for an AttendanceStore as a log of compact inverse changes.
+
+Rather than snapshotting the roster, every change hands the history its
+inverse (see AttendanceStore): the previous value of a toggled cell, the
+overwritten day columns of a bulk mark, the removed rows of a removal,
+or just a row count for an append. Clear hands over its old roster and
+cell buffer without copying them, so undoing a Clear or a Load costs no
+more memory than the data it brings back.
+
+Undoing a step applies its inverses through apply_change, so they are
+journalled like any other change, and the inverses those produce become
+the redo step. Either way a step costs about as much as the original
+change. The history keeps at most max_steps steps and roughly max_bytes
+of saved data, dropping the oldest steps first.
+"""
+from collections import deque
+
+MAX_STEPS = 100
+MAX_BYTES = 64 << 20
+CHANGE_BYTES = 64  # Rough cost of one change record
+ITEM_BYTES = 100  # ...and of one roster entry or cell mark in it
+
+
+def change_size(inverses):
+    """Estimate the memory held by a step's inverse changes"""
+    size = 0
+    for inverse in inverses:
+        for _, kwargs in inverse:
+            size += CHANGE_BYTES
+            for value in kwargs.values():
+                if isinstance(value, (bytes, bytearray)):
+                    size += len(value)
+                elif isinstance(value, list):
+                    size += sum(len(item) if isinstance(item, (bytes, bytearray)) else ITEM_BYTES
+                                for item in value)
+    return size
+
+
+class UndoHistory:
+    """Undo and redo stacks for one store, attached as store.undo.
+
+    Changes made between begin() and end() form one step, e.g. a Load
+    that clears the store and then appends the sheet a chunk at a time.
+    The latest step is always kept, however large.
+    """
+
+    def __init__(self, store, max_steps=MAX_STEPS, max_bytes=MAX_BYTES):
+        self.store = store
+        self.max_steps = max_steps
+        self.max_bytes = max_bytes
+        self.undo_steps = deque()  # (size, inverses), oldest first
+        self.redo_steps = []
+        self.size = 0  # Estimated bytes held by both stacks
+        self.group = None  # Inverses of the step being built by begin()/end()
+        self.depth = 0
+        self.capture = None  # Inverses produced while undoing or redoing
+        store.undo = self
+
+    def record(self, inverse):
+        """Store hook: take the inverse of a change just made"""
+        if self.capture is not None:
+            self.capture.append(inverse)
+        elif self.group is not None:
+            self.group.append(inverse)
+        else:
+            self.drop_redo()
+            self.push([inverse])
+
+    def begin(self):
+        """Start grouping changes into one step; calls may nest"""
+        self.depth += 1
+        if self.depth == 1:
+            self.group = []
+
+    def end(self):
+        """Finish the step started by the matching begin()"""
+        self.depth -= 1
+        if self.depth == 0:
+            inverses, self.group = self.group, None
+            if inverses:
+                self.drop_redo()
+                self.push(inverses)
+
+    def can_undo(self):
+        return bool(self.undo_steps)
+
+    def can_redo(self):
+        return bool(self.redo_steps)
+
+    def undo(self):
+        """Revert the latest step; returns False if there was nothing to undo"""
+        if not self.undo_steps:
+            return False
+        size, inverses = self.undo_steps.pop()
+        self.size -= size
+        redo = self.replay(inverses)
+        size = change_size(redo)
+        self.redo_steps.append((size, redo))
+        self.size += size
+        return True
+
+    def redo(self):
+        """Re-apply the latest undone step; returns False if there was none"""
+        if not self.redo_steps:
+            return False
+        size, inverses = self.redo_steps.pop()
+        self.size -= size
+        self.push(self.replay(inverses))
+        return True
+
+    def replay(self, inverses):
+        """Apply a step's inverses, latest change first, and return their own inverses"""
+        self.capture = []
+        try:
+            for inverse in reversed(inverses):
+                for method, kwargs in inverse:
+                    self.store.apply_change(method, kwargs)
+            return self.capture
+        finally:
+            self.capture = None
+
+    def push(self, inverses):
+        size = change_size(inverses)
+        self.undo_steps.append((size, inverses))
+        self.size += size
+        self.trim()
+
+    def trim(self):
+        """Drop the oldest steps until the history is within its limits"""
+        while len(self.undo_steps) > 1 and (len(self.undo_steps) > self.max_steps or self.size > self.max_bytes):
+            size, _ = self.undo_steps.popleft()
+            self.size -= size
+
+    def drop_redo(self):
+        """A new change makes the undone steps unreachable"""
+        self.size -= sum(size for size, _ in self.redo_steps)
+        self.redo_steps.clear()
+
+    def clear(self):
+        """Forget every step"""
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+        self.size = 0
@@ -0,0 +1,39 @@
+"""Measure how bulk import of a directory of workbooks scales with workers.
+
+Usage: python benchmarks/bench_bulk_import.py [files] [rows per file]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_excel_export import make_store
+from attendance_core import write_attendance_workbook
+from attendance_import import bulk_import
+
+
+def main(files, rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(files):
+            store = make_store(rows, seed=i)
+            store.people = [(name, email, f"D{i}-{sap}") for name, email, sap in store.people]
+            write_attendance_workbook(os.path.join(tmp, f"dept{i:02d}.xlsx"), store, "January", "2024-01-31")
+
+        print(f"{files} files x {rows} rows, {os.cpu_count()} CPUs")
+        baseline = None
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            start = time.perf_counter()
+            merged, report = bulk_import(tmp, workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:>3} workers: {elapsed:6.2f} s  {len(merged) / elapsed:>9,.0f} rows/s  "
+                  f"speedup {baseline / elapsed:4.1f}x")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [8, 2000][len(args):]))
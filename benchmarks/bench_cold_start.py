@@ -0,0 +1,56 @@
+"""Measure cold-start time of the command line tool and the GUI.
+
+Each case runs in a fresh interpreter and the median wall time is shown.
+The time-to-first-window case needs a display (e.g. run under xvfb-run)
+and is reported as skipped without one.
+
+Usage: python benchmarks/bench_cold_start.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from bench_excel_export import make_store
+from attendance_core import write_attendance_workbook
+
+
+def median_ms(argv, runs):
+    """Median wall time of running argv in a fresh process, in milliseconds"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main(runs):
+    cli = os.path.join(ROOT, "attendance_cli.py")
+    with tempfile.TemporaryDirectory() as tmp:
+        sheet = os.path.join(tmp, "sheet.xlsx")
+        write_attendance_workbook(sheet, make_store(100), "January", "2024-01-31")
+        cases = [
+            ("python (baseline)", [sys.executable, "-c", "pass"]),
+            ("import attendance_core", [sys.executable, "-c", "import attendance_core"]),
+            ("attendance_cli.py --help", [sys.executable, cli, "--help"]),
+            ("attendance_cli.py summary (100 rows)", [sys.executable, cli, "summary", sheet]),
+            ("import AttendenceManagementSystem", [sys.executable, "-c", "import AttendenceManagementSystem"]),
+            ("GUI time to first window", [sys.executable, os.path.join(ROOT, "AttendenceManagementSystem.py"),
+                                          "--measure-startup"]),
+        ]
+        for label, argv in cases:
+            try:
+                print(f"{label:<40} {median_ms(argv, runs):8.1f} ms")
+            except subprocess.CalledProcessError as e:
+                reason = e.stderr.decode(errors="replace").strip().splitlines()[-1:] or ["failed"]
+                print(f"{label:<40} skipped ({reason[0]})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,80 @@
+"""Compare the cell-by-cell Excel save with the streaming write-only exporter.
+
+Reports throughput (rows/second) and peak Python memory for each.
+
+Usage: python benchmarks/bench_excel_export.py [rows ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from openpyxl import Workbook
+
+from attendance_core import AttendanceStore, write_attendance_workbook
+
+
+def make_store(rows, seed=0):
+    """Build a synthetic roster with random attendance"""
+    rng = random.Random(seed)
+    store = AttendanceStore()
+    for i in range(rows):
+        marks = [rng.random() < 0.8 for _ in range(store.days)]
+        store.add_person(f"Person {i}", f"person{i}@example.com", f"SAP{i:06d}", marks)
+    return store
+
+
+def save_cell_by_cell(file_path, store, month, date):
+    """The previous save_attendance implementation, minus the dialogs"""
+    wb = Workbook()
+    ws = wb.active
+    ws['A1'] = "Month"
+    ws['B1'] = month
+    ws['A2'] = "Date of update"
+    ws['B2'] = date
+    ws['A3'] = "Name"
+    ws['B3'] = "Email"
+    ws['C3'] = "SAP ID"
+    for day in range(1, 32):
+        ws.cell(row=3, column=3+day, value=day)
+    for index, (name, email, sap) in enumerate(store.people):
+        row = index + 4
+        ws.cell(row=row, column=1, value=name)
+        ws.cell(row=row, column=2, value=email)
+        ws.cell(row=row, column=3, value=sap)
+        for day, value in enumerate(store.row(index), start=1):
+            ws.cell(row=row, column=3+day, value="Present" if value else "Absent")
+    wb.save(file_path)
+
+
+def timed(func, *args):
+    """Return (seconds, peak traced MiB), timing an untraced call first"""
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(sizes):
+    print(f"{'rows':>8} {'cell-by-cell rows/s':>20} {'peak MiB':>9} "
+          f"{'streaming rows/s':>17} {'peak MiB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            store = make_store(rows)
+            path = os.path.join(tmp, "attendance.xlsx")
+            before, before_peak = timed(save_cell_by_cell, path, store, "January", "2024-01-31")
+            after, after_peak = timed(write_attendance_workbook, path, store, "January", "2024-01-31")
+            print(f"{rows:>8} {rows / before:>20,.0f} {before_peak:>9.1f} "
+                  f"{rows / after:>17,.0f} {after_peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000])
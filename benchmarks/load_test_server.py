@@ -0,0 +1,134 @@
+"""Load-test the attendance HTTP API on localhost.
+
+Starts ``attendance_cli.py serve`` on a synthetic sheet (or targets an
+already running server with --port and --no-start), then has many
+keep-alive clients send marks, with some summary lookups mixed in, and
+reports requests per second and latency percentiles.
+
+Usage:
+    python benchmarks/load_test_server.py [--rows 1000] [--clients 50]
+        [--requests 200] [--summary-share 0.1] [--port 8766] [--no-start]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from bench_excel_export import make_store
+from attendance_core import write_attendance_workbook
+from attendance_perf import percentile
+
+YEAR, MONTH = 2024, 1
+
+
+async def request(reader, writer, method, path, payload=None):
+    """Send one keep-alive request and return (status, decoded body)"""
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(port, rows, count, summary_share, seed, latencies, errors):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for _ in range(count):
+            sap = f"SAP{rng.randrange(rows):06d}"
+            start = time.perf_counter()
+            if rng.random() < summary_share:
+                status, _ = await request(reader, writer, "GET", f"/summary?sap={sap}")
+            else:
+                date = f"{YEAR}-{MONTH:02d}-{rng.randint(1, 31):02d}"
+                status, _ = await request(reader, writer, "POST", "/mark",
+                                          {"sap": sap, "date": date, "present": rng.random() < 0.8})
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load(port, rows, clients, requests, summary_share):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, rows, requests, summary_share, seed, latencies, errors)
+                           for seed in range(clients)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def wait_for_port(port, process, timeout=30):
+    """Wait until the server accepts connections"""
+    async def probe():
+        _, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.close()
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("The server exited during startup")
+        try:
+            asyncio.run(probe())
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f"The server did not start listening on port {port}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=50, help="concurrent keep-alive connections")
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--summary-share", type=float, default=0.1,
+                        help="fraction of requests that are GET /summary instead of POST /mark")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--no-start", action="store_true",
+                        help="test a server already running on --port (its roster must use SAP000000...)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = None
+        if not args.no_start:
+            sheet = os.path.join(tmp, "sheet.xlsx")
+            write_attendance_workbook(sheet, make_store(args.rows), "January", f"{YEAR}-{MONTH:02d}-31")
+            process = subprocess.Popen([sys.executable, os.path.join(ROOT, "attendance_cli.py"), "serve", sheet,
+                                        "--port", str(args.port), "--db", os.path.join(tmp, "load.db")],
+                                       stdout=subprocess.DEVNULL)
+            wait_for_port(args.port, process)
+        try:
+            elapsed, latencies, errors = asyncio.run(
+                run_load(args.port, args.rows, args.clients, args.requests, args.summary_share))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    ordered = sorted(latencies)
+    print(f"{len(ordered)} requests from {args.clients} clients in {elapsed:.2f} s "
+          f"({len(ordered) / elapsed:.0f} req/s), {len(errors)} errors")
+    for p in (50, 95, 99):
+        print(f"p{p}: {percentile(ordered, p) * 1000:8.2f} ms")
+    print(f"max: {ordered[-1] * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
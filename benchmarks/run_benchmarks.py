@@ -0,0 +1,185 @@
+"""Benchmark suite for the attendance hot paths.
+
+Times the summary, grid, report and Excel round-trip paths on synthetic
+rosters and writes the results to a JSON file, so runs of different
+versions can be compared with --compare.
+
+The Tk cases need a display. On a headless machine run the suite under a
+virtual one, e.g. ``xvfb-run python benchmarks/run_benchmarks.py``;
+without a display they are recorded as skipped.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 100 1000 10000 100000]
+        [--repeat 5] [--max-io-rows 10000] [-o results.json] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from bench_excel_export import make_store
+from attendance_analytics import compute_analytics
+from attendance_core import read_attendance_file, write_attendance_file
+
+
+def measure(func, repeat):
+    """Return the per-call times of func in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def result(name, size, times=None, skipped=None):
+    entry = {"name": name, "size": size}
+    if skipped:
+        entry["skipped"] = skipped
+    else:
+        entry.update(repeat=len(times), median=statistics.median(times), min=min(times))
+    return entry
+
+
+def core_cases(store, repeat, max_io_rows, tmp):
+    """Benchmarks that need no display"""
+    size = len(store)
+    yield result("get_attendance_summary", size, measure(store.summary, repeat))
+    yield result("report_analytics", size, measure(lambda: compute_analytics(store, 2024, 1), repeat))
+
+    for name, ext in (("columnar", ".attc"), ("csv", ".csv"), ("excel", ".xlsx")):
+        if ext == ".xlsx" and size > max_io_rows:
+            yield result("excel_save_load_roundtrip", size, skipped=f"more than --max-io-rows={max_io_rows}")
+            continue
+        path = os.path.join(tmp, f"roundtrip_{size}{ext}")
+
+        def roundtrip():
+            write_attendance_file(path, store, "January", "2024-01-31")
+            read_attendance_file(path)
+        yield result(f"{name}_save_load_roundtrip", size, measure(roundtrip, max(1, repeat // 2)))
+
+
+def open_app():
+    """Create a withdrawn AttendanceApp, or return the reason it cannot run"""
+    import tkinter as tk
+    try:
+        from AttendenceManagementSystem import AttendanceApp
+        app = AttendanceApp(autosave=False)
+    except tk.TclError as e:
+        return None, f"no display ({e})"
+    app.withdraw()
+    app.geometry("1200x800")
+    app.update_idletasks()
+    return app, None
+
+
+TK_CASES = ("AttendancePage.update_display", "AttendancePage.update_summary", "AttendancePage.update_summary (cached)",
+            "ReportsPage.update_report", "ReportsPage.update_report (cached)")
+
+
+def tk_cases(app, store, repeat):
+    """Benchmarks that drive the real Tk pages.
+
+    The plain cases empty the report cache on every repeat, so they time
+    the full render and stay comparable with results from before the
+    cache; the "(cached)" cases time the repeat with a warm cache.
+    """
+    size = len(store)
+    app.store.clear()
+    app.store.extend(store.people, store.cells)
+    page = app.get_frame("AttendancePage")
+    reports = app.get_frame("ReportsPage")
+
+    def uncached(render):
+        def run():
+            app.report_cache.clear()
+            reports.shown_report = None
+            page.shown_summary = None
+            render()
+        return run
+
+    def update_display():
+        page.update_display()
+        app.update_idletasks()
+    yield result("AttendancePage.update_display", size, measure(uncached(update_display), repeat))
+    yield result("AttendancePage.update_summary", size, measure(uncached(page.update_summary), repeat))
+    yield result("AttendancePage.update_summary (cached)", size, measure(page.update_summary, repeat))
+    yield result("ReportsPage.update_report", size, measure(uncached(reports.update_report), repeat))
+    yield result("ReportsPage.update_report (cached)", size, measure(reports.update_report, repeat))
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print each case's median against a previous results file"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["name"], r["size"]): r for r in json.load(f)["results"] if "median" in r}
+    print(f"\nCompared with {baseline_path}:")
+    for r in results:
+        old = baseline.get((r["name"], r["size"]))
+        if old and "median" in r:
+            print(f"{r['name']:<40} {r['size']:>7}  {old['median'] * 1000:10.2f} ms -> "
+                  f"{r['median'] * 1000:10.2f} ms  ({r['median'] / old['median']:.2f}x)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-io-rows", type=int, default=10000,
+                        help="largest roster to run the Excel round-trip on")
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args(argv)
+
+    app, no_tk = open_app()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            store = make_store(size)
+            cases = list(core_cases(store, args.repeat, args.max_io_rows, tmp))
+            if app is not None:
+                cases += tk_cases(app, store, args.repeat)
+            else:
+                cases += [result(name, size, skipped=no_tk) for name in TK_CASES]
+            for r in cases:
+                timing = r.get("skipped") or f"{r['median'] * 1000:10.2f} ms"
+                print(f"{r['name']:<40} {size:>7}  {timing}")
+            results += cases
+    if app is not None:
+        app.destroy()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        },
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
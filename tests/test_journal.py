@@ -0,0 +1,52 @@
+from attendance_core import AttendanceStore
+from attendance_journal import Journal
+
+
+def open_session(directory):
+    """Start a session the way the app does: recover, then journal every change"""
+    journal = Journal(str(directory))
+    store, _, _ = journal.recover(31)
+    store.listeners.append(journal.record)
+    return journal, store
+
+
+def test_changes_after_compaction_survive_restart(tmp_path):
+    journal, store = open_session(tmp_path)
+    store.add_person("Ada", "ada@example.com", "1001")
+    journal.write_snapshot(store.copy(), journal.rotate())
+    journal.close()
+
+    # The snapshot deleted every segment; the next session must not reuse their numbers
+    journal, store = open_session(tmp_path)
+    store.add_person("Grace", "grace@example.com", "1002")
+    store.toggle(1, 4)
+    journal.close()
+
+    recovered, _, replayed = Journal(str(tmp_path)).recover(31)
+    assert replayed == 2
+    assert recovered.people == store.people
+    assert recovered.cells == store.cells
+
+
+def test_recover_stops_at_torn_line(tmp_path):
+    journal, store = open_session(tmp_path)
+    store.add_person("Ada", "", "1001")
+    store.toggle(0, 0)
+    journal.close()
+    path = journal.segment_path(journal.segment)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('["set",{"index":0')
+
+    recovered, _, replayed = Journal(str(tmp_path)).recover(31)
+    assert replayed == 2
+    assert recovered.cells == store.cells
+
+
+def test_store_round_trips_through_snapshot(tmp_path):
+    journal = Journal(str(tmp_path))
+    store = AttendanceStore()
+    store.extend([("Ada", "", "1001"), ("Grace", "", "1002")], bytes([1, 0] * 31))
+    journal.write_snapshot(store, journal.rotate(), {"month": "March"})
+
+    recovered, meta, replayed = Journal(str(tmp_path)).recover(31)
+    assert (recovered.people, recovered.cells, meta, replayed) == (store.people, store.cells, {"month": "March"}, 0)
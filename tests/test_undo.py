@@ -0,0 +1,85 @@
+from attendance_core import AttendanceStore
+from attendance_undo import UndoHistory
+
+
+def snapshot(store):
+    return (list(store.people), bytes(store.cells), list(store.present), store.total_present,
+            dict(store.rows_by_sap))
+
+
+def make_store(rows=4):
+    store = AttendanceStore()
+    store.extend([(f"Person {row}", f"p{row}@example.com", f"{1000 + row}") for row in range(rows)],
+                 bytes((row + day) % 2 for row in range(rows) for day in range(31)))
+    return store, UndoHistory(store)
+
+
+def check_undo_redo(store, history, change):
+    """Apply change, then check that undo restores and redo re-applies it"""
+    before = snapshot(store)
+    change()
+    after = snapshot(store)
+    assert history.undo()
+    assert snapshot(store) == before
+    assert history.redo()
+    assert snapshot(store) == after
+
+
+def test_set_many_repeated_cell():
+    store, history = make_store()
+    store.set(0, 3, 0)
+    history.clear()
+    check_undo_redo(store, history, lambda: store.set_many([(0, 3, 1), (0, 3, 0)]))
+    history.undo()
+    assert store.get(0, 3) == 0
+
+
+def test_clear_then_undo():
+    store, history = make_store()
+    check_undo_redo(store, history, store.clear)
+
+
+def test_upsert_then_undo():
+    store, history = make_store()
+    check_undo_redo(store, history, lambda: store.upsert_people([
+        ("Renamed", "", "1001"), ("New Person", "new@example.com", "2000")]))
+
+
+def test_mark_block_row_subset_then_undo():
+    store, history = make_store()
+    check_undo_redo(store, history, lambda: store.mark_block(2, 9, 1, [3, 1]))
+    check_undo_redo(store, history, lambda: store.copy_day(4, 5, [0, 2]))
+
+
+def test_remove_people_then_undo():
+    store, history = make_store(6)
+    check_undo_redo(store, history, lambda: store.remove_people([4, 0, 2]))
+
+
+def test_grouped_load_is_one_step():
+    store, history = make_store()
+    before = snapshot(store)
+    history.begin()
+    store.clear()
+    store.extend([("A", "", "1"), ("B", "", "2")], bytes(62))
+    store.extend([("C", "", "3")], bytes([1]) * 31)
+    history.end()
+    assert history.undo()
+    assert snapshot(store) == before
+    assert not history.can_undo()
+
+
+def test_new_change_drops_redo():
+    store, history = make_store()
+    store.toggle(0, 0)
+    history.undo()
+    store.toggle(1, 1)
+    assert not history.can_redo()
+
+
+def test_history_is_bounded():
+    store, history = make_store()
+    history.max_steps = 3
+    for day in range(10):
+        store.toggle(0, day)
+    assert len(history.undo_steps) == 3